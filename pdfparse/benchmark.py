@@ -0,0 +1,386 @@
+"""
+Per-stage benchmark of ResearchPaperParser on synthetic papers.
+
+Synthetic PDFs with a controllable number of pages, text columns, tables, equations
+and embedded images are generated with PyMuPDF. Every stage of the parser is then
+timed separately on every page, and pages/s, p50/p95 per stage and peak RSS are
+reported. When the model weights are not cached locally, a randomly initialised
+table transformer (same architecture and cost, no download) and a no-op LatexOCR
+stand in for the real models.
+
+Usage:
+    python -m pdfparse.benchmark --pages 20 --columns 2 --tables 1 --equations 2 --images 1
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from pdfparse.models import (
+    TABLE_MODEL_NAME,
+    ModelRegistry,
+    _load_latex_ocr,
+    _load_table_model,
+    _load_table_processor,
+)
+from pdfparse.parse import ResearchPaperParser
+
+logger = logging.getLogger(__name__)
+
+STAGES = (
+    "load_pdf",
+    "detect_columns",
+    "extract_text",
+    "convert_page_to_image",
+    "table_prefilter",
+    "detect_tables",
+    "extract_table_content",
+    "detect_and_convert_math",
+    "extract_images",
+    "save_results",
+)
+WORDS = (
+    "model data training results method proposed network learning performance "
+    "baseline accuracy loss dataset experiments evaluation approach feature layer"
+).split()
+MARGIN = 50
+
+
+def _paragraph(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)) + "."
+
+
+def make_synthetic_paper(
+    path: str,
+    pages: int = 10,
+    columns: int = 2,
+    tables: int = 1,
+    equations: int = 2,
+    images: int = 1,
+    seed: int = 0,
+) -> Dict[int, List[Tuple[float, float, float, float]]]:
+    """
+    Writes a synthetic paper to `path`. Every page stacks the requested tables
+    (ruled grids of text cells), display equations (set in a math font) and
+    embedded raster images at the top, followed by body text in `columns` columns.
+
+    Returns:
+        Dict: the rectangles of the tables on every page, in page points
+    """
+    rng = random.Random(seed)
+    document = fitz.open()
+    table_rects = {}
+    for page_num in range(pages):
+        page = document.new_page()
+        width, height = page.rect.width, page.rect.height
+        y = MARGIN
+        table_rects[page_num] = []
+
+        for _ in range(tables):
+            rect = fitz.Rect(MARGIN, y, width - MARGIN, y + 100)
+            rows, cols = 5, 4
+            for r in range(rows + 1):
+                row_y = rect.y0 + r * rect.height / rows
+                page.draw_line((rect.x0, row_y), (rect.x1, row_y))
+            for c in range(cols):
+                for r in range(rows):
+                    page.insert_text(
+                        (
+                            rect.x0 + 5 + c * rect.width / cols,
+                            rect.y0 + 14 + r * rect.height / rows,
+                        ),
+                        f"{rng.choice(WORDS)} {rng.randint(0, 99)}.{rng.randint(0, 9)}",
+                        fontsize=9,
+                    )
+            table_rects[page_num].append(tuple(rect))
+            y = rect.y1 + 15
+
+        for _ in range(equations):
+            # The Symbol font maps these letters to Greek glyphs
+            page.insert_text((MARGIN + 80, y + 12), "S a + b = g D x", fontname="symb")
+            y += 25
+
+        for _ in range(images):
+            side = 64
+            samples = bytes(rng.getrandbits(8) for _ in range(side * side * 3))
+            pixmap = fitz.Pixmap(fitz.csRGB, side, side, samples, False)
+            page.insert_image(fitz.Rect(MARGIN, y, MARGIN + 120, y + 80), pixmap=pixmap)
+            y += 95
+
+        gap = 30
+        column_width = (width - 2 * MARGIN - (columns - 1) * gap) / columns
+        for c in range(columns):
+            x0 = MARGIN + c * (column_width + gap)
+            column_rect = fitz.Rect(x0, y, x0 + column_width, height - MARGIN)
+            paragraphs = [_paragraph(rng, 40) for _ in range(12)]
+            # insert_textbox writes nothing and returns a negative value when the
+            # text overflows the rectangle, so drop paragraphs until it fits
+            while paragraphs:
+                if page.insert_textbox(column_rect, " ".join(paragraphs), fontsize=9) >= 0:
+                    break
+                paragraphs.pop()
+            assert paragraphs, f"no body text fits column {c} of page {page_num}"
+
+    document.save(path)
+    return table_rects
+
+
+def _weights_cached() -> bool:
+    try:
+        from transformers import TableTransformerForObjectDetection
+
+        TableTransformerForObjectDetection.from_pretrained(
+            TABLE_MODEL_NAME, local_files_only=True
+        )
+        return True
+    except Exception:
+        return False
+
+
+def _latex_weights_cached() -> bool:
+    try:
+        import pix2tex
+
+        checkpoints = os.path.join(
+            os.path.dirname(pix2tex.__file__), "model", "checkpoints"
+        )
+        return os.path.exists(os.path.join(checkpoints, "weights.pth"))
+    except Exception:
+        return False
+
+
+def _load_stub_table_model():
+    from transformers import TableTransformerConfig, TableTransformerForObjectDetection
+
+    model = TableTransformerForObjectDetection(
+        TableTransformerConfig(use_pretrained_backbone=False)
+    )
+    model.eval()
+    return model
+
+
+def benchmark_registry(
+    stub_models: bool = None,
+) -> Tuple[ModelRegistry, Dict[str, bool]]:
+    """
+    Builds the registry used by the benchmark, with the real models when their
+    weights are cached (or `stub_models` is False) and stand-ins otherwise.
+    """
+    stubs = {
+        "table_model": not _weights_cached() if stub_models is None else stub_models,
+        "latex_ocr": not _latex_weights_cached()
+        if stub_models is None
+        else stub_models,
+    }
+    registry = ModelRegistry()
+    registry.register("table_processor", _load_table_processor)
+    if stubs["table_model"]:
+        registry.register("table_model", _load_stub_table_model)
+    else:
+        registry.register("table_model", _load_table_model)
+    if stubs["latex_ocr"]:
+        registry.register("latex_ocr", lambda: (lambda image: ""))
+    else:
+        registry.register("latex_ocr", _load_latex_ocr)
+    return registry, stubs
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_benchmark(
+    pdf_path: str,
+    table_rects: Dict[int, List[Tuple[float, float, float, float]]],
+    registry: ModelRegistry,
+    output_dir: str,
+    batch_size: int = 4,
+) -> Dict[str, List[float]]:
+    """
+    Times every stage of the parser on every page of `pdf_path`.
+
+    Returns:
+        Dict: the timings, in seconds, of each stage; per page for per-page stages
+    """
+    timings = defaultdict(list)
+
+    def timed(stage, fn, *args, **kwargs):
+        start_time = time.perf_counter()
+        result = fn(*args, **kwargs)
+        timings[stage].append(time.perf_counter() - start_time)
+        return result
+
+    parser = ResearchPaperParser(
+        pdf_path,
+        output_dir=output_dir,
+        save=True,
+        registry=registry,
+        table_batch_size=batch_size,
+    )
+    registry.warm()
+    timed("load_pdf", parser.load_pdf)
+
+    page_results = []
+    total_pages = len(parser.document)
+    for batch_start in range(0, total_pages, batch_size):
+        batch_pages = range(batch_start, min(batch_start + batch_size, total_pages))
+        rasters = [
+            timed(
+                "convert_page_to_image",
+                parser.get_page_raster,
+                p,
+                parser.detection_zoom,
+            )
+            for p in batch_pages
+        ]
+        candidates = [
+            timed("table_prefilter", parser.may_contain_table, p) for p in batch_pages
+        ]
+
+        start_time = time.perf_counter()
+        parser.detect_tables_batch(
+            [raster for raster, candidate in zip(rasters, candidates) if candidate]
+        )
+        per_page = (time.perf_counter() - start_time) / len(rasters)
+        timings["detect_tables"].extend([per_page] * len(rasters))
+
+        for page_num, raster in zip(batch_pages, rasters):
+            timed("detect_columns", parser.detect_columns, page_num)
+            text = timed("extract_text", parser.extract_text, page_num)
+
+            # Stand-in detectors rarely fire, so the known table positions are
+            # used to keep the crop/OCR stage representative
+            tables = [
+                {
+                    "confidence": 1.0,
+                    "box": [int(v * parser.detection_zoom) for v in rect],
+                }
+                for rect in table_rects.get(page_num, [])
+            ]
+            table_records = timed(
+                "extract_table_content", parser.extract_tables, raster, tables, page_num
+            )
+            equations = timed(
+                "detect_and_convert_math",
+                parser.detect_and_convert_math,
+                raster,
+                page_num,
+            )
+            embedded = timed("extract_images", parser.extract_images, page_num)
+            page_results.append(
+                {
+                    "page": page_num,
+                    "text": text,
+                    "tables": table_records,
+                    "equations": equations,
+                    "image": None,
+                    "embedded_images": embedded,
+                }
+            )
+
+    timed("save_results", parser.save_results, page_results)
+    return timings
+
+
+def summarize(
+    timings: Dict[str, List[float]], pages: int
+) -> Dict[str, Dict[str, float]]:
+    summary = {}
+    for stage in STAGES:
+        samples = np.array(timings.get(stage, []))
+        if samples.size == 0:
+            continue
+        summary[stage] = {
+            "total_s": float(samples.sum()),
+            "p50_ms": float(np.percentile(samples, 50) * 1000),
+            "p95_ms": float(np.percentile(samples, 95) * 1000),
+            "share": 0.0,
+        }
+    total = sum(stage["total_s"] for stage in summary.values())
+    for stage in summary.values():
+        stage["share"] = stage["total_s"] / total if total else 0.0
+    summary["overall"] = {
+        "pages": pages,
+        "total_s": total,
+        "pages_per_s": pages / total if total else 0.0,
+        "peak_rss_mib": peak_rss_bytes() / 2**20,
+    }
+    return summary
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--pages", type=int, default=10)
+    arg_parser.add_argument("--columns", type=int, default=2)
+    arg_parser.add_argument("--tables", type=int, default=1)
+    arg_parser.add_argument("--equations", type=int, default=2)
+    arg_parser.add_argument("--images", type=int, default=1)
+    arg_parser.add_argument("--batch-size", type=int, default=4)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument(
+        "--stub-models",
+        choices=("auto", "yes", "no"),
+        default="auto",
+        help="use stand-in models (auto: only when weights are not cached)",
+    )
+    arg_parser.add_argument("--json", action="store_true", help="print JSON only")
+    args = arg_parser.parse_args()
+
+    stub_models = {"auto": None, "yes": True, "no": False}[args.stub_models]
+    registry, stubs = benchmark_registry(stub_models)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        pdf_path = os.path.join(workdir, "synthetic.pdf")
+        table_rects = make_synthetic_paper(
+            pdf_path,
+            pages=args.pages,
+            columns=args.columns,
+            tables=args.tables,
+            equations=args.equations,
+            images=args.images,
+            seed=args.seed,
+        )
+        timings = run_benchmark(
+            pdf_path,
+            table_rects,
+            registry,
+            os.path.join(workdir, "output"),
+            batch_size=args.batch_size,
+        )
+
+    summary = summarize(timings, args.pages)
+    summary["overall"]["stub_models"] = stubs
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"{'stage':<26}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}{'share':>8}")
+    for stage in STAGES:
+        if stage in summary:
+            row = summary[stage]
+            print(
+                f"{stage:<26}{row['total_s']:>10.3f}{row['p50_ms']:>10.1f}"
+                f"{row['p95_ms']:>10.1f}{row['share']:>8.1%}"
+            )
+    overall = summary["overall"]
+    print(
+        f"\n{overall['pages']} pages in {overall['total_s']:.2f} s "
+        f"({overall['pages_per_s']:.2f} pages/s), peak RSS {overall['peak_rss_mib']:.0f} MiB"
+    )
+    print(f"Stand-in models: {', '.join(k for k, v in stubs.items() if v) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Build time and query latency of the Chroma and NumPy vector index backends.
+
+Both backends index the same normalized vectors, so the numbers measure the
+indexes alone and not the embedding model, whose cost is the same for both.
+Vectors are random unless --embed is given, in which case synthetic chunks are
+embedded with the real model first. The Chroma path is the one RAG uses: a
+persistent client, a fresh collection, `add` and then one `query` per question.
+
+Usage:
+    python -m pdfparse.benchmark_index --chunks 300 --queries 200 --top-k 5
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Tuple
+
+import numpy as np
+from llama_index.core.schema import TextNode
+
+from pdfparse.benchmark import WORDS
+from pdfparse.numpy_index import NumpyIndex, normalize
+
+
+def make_vectors(
+    chunks: int, queries: int, dim: int, embed: bool, seed: int = 0
+) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Returns the chunk texts, the chunk vectors and the query vectors.
+    """
+    rng = random.Random(seed)
+    texts = [" ".join(rng.choice(WORDS) for _ in range(150)) for _ in range(chunks)]
+    questions = [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(queries)]
+    if embed:
+        from pdfparse.models import registry
+
+        embed_model = registry.get("embed_model")
+        chunk_vectors = np.array(embed_model.embed_documents(texts), dtype=np.float32)
+        query_vectors = np.array(embed_model.embed_queries(questions), dtype=np.float32)
+    else:
+        generator = np.random.default_rng(seed)
+        chunk_vectors = generator.standard_normal((chunks, dim), dtype=np.float32)
+        query_vectors = generator.standard_normal((queries, dim), dtype=np.float32)
+    return texts, normalize(chunk_vectors), normalize(query_vectors)
+
+
+def bench_chroma(
+    texts: List[str], chunk_vectors: np.ndarray, query_vectors: np.ndarray, top_k: int
+) -> Dict[str, object]:
+    import chromadb
+
+    with tempfile.TemporaryDirectory() as workdir:
+        start_time = time.perf_counter()
+        client = chromadb.PersistentClient(path=workdir)
+        collection = client.create_collection(
+            f"bench_{uuid.uuid4().hex[:8]}", metadata={"hnsw:space": "cosine"}
+        )
+        collection.add(
+            ids=[str(i) for i in range(len(texts))],
+            embeddings=chunk_vectors.tolist(),
+            documents=texts,
+        )
+        build_seconds = time.perf_counter() - start_time
+
+        latencies = []
+        results = []
+        for query_vector in query_vectors:
+            start_time = time.perf_counter()
+            result = collection.query(
+                query_embeddings=[query_vector.tolist()], n_results=top_k
+            )
+            latencies.append(time.perf_counter() - start_time)
+            results.append([int(i) for i in result["ids"][0]])
+    return {"build_s": build_seconds, "latencies": latencies, "results": results}
+
+
+def bench_numpy(
+    texts: List[str],
+    chunk_vectors: np.ndarray,
+    query_vectors: np.ndarray,
+    top_k: int,
+    mmap: bool,
+) -> Dict[str, object]:
+    with tempfile.TemporaryDirectory() as workdir:
+        start_time = time.perf_counter()
+        nodes = [TextNode(text=text) for text in texts]
+        index = NumpyIndex(normalize(chunk_vectors), nodes, embed_model=None)
+        if mmap:
+            index.save(os.path.join(workdir, "index"))
+            index = NumpyIndex.load(os.path.join(workdir, "index"), None, mmap=True)
+        build_seconds = time.perf_counter() - start_time
+
+        latencies = []
+        results = []
+        for query_vector in query_vectors:
+            start_time = time.perf_counter()
+            indices, _ = index.search(query_vector, top_k)
+            latencies.append(time.perf_counter() - start_time)
+            results.append([int(i) for i in indices[0]])
+
+        start_time = time.perf_counter()
+        index.search(query_vectors, top_k)
+        batch_seconds = time.perf_counter() - start_time
+    return {
+        "build_s": build_seconds,
+        "latencies": latencies,
+        "results": results,
+        "batch_s": batch_seconds,
+    }
+
+
+def recall_at_k(reference: List[List[int]], candidate: List[List[int]]) -> float:
+    hits = sum(len(set(r) & set(c)) for r, c in zip(reference, candidate))
+    total = sum(len(r) for r in reference)
+    return hits / total if total else 1.0
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--chunks", type=int, default=300)
+    arg_parser.add_argument("--queries", type=int, default=200)
+    arg_parser.add_argument("--dim", type=int, default=384)
+    arg_parser.add_argument("--top-k", type=int, default=5)
+    arg_parser.add_argument("--embed", action="store_true", help="embed synthetic text")
+    arg_parser.add_argument("--mmap", action="store_true", help="save and mmap the NumPy index")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    texts, chunk_vectors, query_vectors = make_vectors(
+        args.chunks, args.queries, args.dim, args.embed, args.seed
+    )
+    numpy_run = bench_numpy(texts, chunk_vectors, query_vectors, args.top_k, args.mmap)
+    chroma_run = bench_chroma(texts, chunk_vectors, query_vectors, args.top_k)
+
+    print(f"{args.chunks} chunks, {args.queries} queries, top-{args.top_k}")
+    print(f"{'backend':<8}{'build ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, run in (("chroma", chroma_run), ("numpy", numpy_run)):
+        latencies = np.array(run["latencies"]) * 1000
+        print(
+            f"{name:<8}{run['build_s'] * 1000:>10.2f}"
+            f"{np.percentile(latencies, 50):>10.3f}{np.percentile(latencies, 95):>10.3f}"
+        )
+    print(
+        f"numpy, all queries in one product: {numpy_run['batch_s'] * 1000:.2f} ms; "
+        f"recall of chroma against exact search: "
+        f"{recall_at_k(numpy_run['results'], chroma_run['results']):.3f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Recall@k of dense and hybrid (dense + BM25) retrieval on a small labelled set.
+
+Synthetic chunks of filler text each state a few facts (a model, a dataset, a
+metric and its value), and every question asks about one fact, so the chunk that
+answers it is known. Chunks and questions are embedded with the RAG embedding
+model, dense retrieval is an exact search over the chunk vectors, and hybrid
+retrieval fuses it with BM25 exactly as `RAG.create_retriever(hybrid=True)` does.
+
+The report ends with the smallest k at which hybrid retrieval finds at least as
+many answering chunks as dense retrieval does at the baseline k; that is the
+top-k the answerer can use without losing recall.
+
+Usage:
+    python -m pdfparse.benchmark_retrieval --chunks 200 --questions 100 --baseline-k 5
+"""
+import argparse
+import random
+from typing import Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+from llama_index.core.schema import QueryBundle, TextNode
+
+from pdfparse.benchmark import WORDS
+from pdfparse.lexical import BM25Index, HybridRetriever
+from pdfparse.numpy_index import NumpyIndex, normalize
+
+MODELS = ("ResNet-50", "BERT-base", "ViT-B16", "LSTM", "GPT-2", "U-Net", "XGBoost")
+DATASETS = ("CIFAR-10", "ImageNet", "SQuAD", "MNIST", "COCO", "GLUE", "WMT-14")
+METRICS = ("accuracy", "F1", "BLEU", "mAP", "perplexity", "recall")
+QUESTION_TEMPLATES = (
+    "Does the paper report the {metric} of {model} on {dataset}?",
+    "Is {model} evaluated on {dataset}?",
+    "Is a {metric} of {value} reached on {dataset}?",
+)
+
+
+def make_labelled_set(
+    chunks: int, questions: int, facts_per_chunk: int = 2, seed: int = 0
+) -> Tuple[List[str], List[str], List[Set[int]]]:
+    """
+    Returns the chunk texts, the questions and, for every question, the ids of
+    the chunks that answer it.
+    """
+    rng = random.Random(seed)
+    texts = []
+    facts = []
+    for chunk_id in range(chunks):
+        sentences = [
+            " ".join(rng.choice(WORDS) for _ in range(20)) + "." for _ in range(6)
+        ]
+        for _ in range(facts_per_chunk):
+            fact = {
+                "model": rng.choice(MODELS),
+                "dataset": rng.choice(DATASETS),
+                "metric": rng.choice(METRICS),
+                "value": f"{rng.uniform(10, 99):.1f}",
+            }
+            sentences.insert(
+                rng.randrange(len(sentences) + 1),
+                "{model} reaches a {metric} of {value} on {dataset}.".format(**fact),
+            )
+            facts.append((chunk_id, fact))
+        texts.append(" ".join(sentences))
+
+    queries = []
+    relevant = []
+    for chunk_id, fact in rng.sample(facts, min(questions, len(facts))):
+        template = rng.choice(QUESTION_TEMPLATES)
+        queries.append(template.format(**fact))
+        # Other chunks stating the same fact answer the question just as well
+        asked = [field for field in fact if f"{{{field}}}" in template]
+        relevant.append(
+            {
+                other_id
+                for other_id, other in facts
+                if all(other[field] == fact[field] for field in asked)
+            }
+        )
+    return texts, queries, relevant
+
+
+def labelled_recall(
+    relevant: Sequence[Set[int]], retrieved: Sequence[Sequence[int]]
+) -> float:
+    """
+    Returns the share of questions for which at least one answering chunk was
+    retrieved.
+    """
+    hits = sum(bool(answers & set(ids)) for answers, ids in zip(relevant, retrieved))
+    return hits / len(relevant) if relevant else 1.0
+
+
+def compare_recall(
+    texts: List[str],
+    queries: List[str],
+    relevant: List[Set[int]],
+    chunk_vectors: np.ndarray,
+    query_vectors: np.ndarray,
+    ks: Sequence[int],
+    alpha: float = 0.5,
+) -> Dict[str, Dict[int, float]]:
+    """
+    Returns the labelled recall of dense and hybrid retrieval at every k in `ks`.
+    """
+    nodes = [TextNode(id_=str(i), text=text) for i, text in enumerate(texts)]
+    index = NumpyIndex(normalize(chunk_vectors), nodes, embed_model=None)
+    lexical = BM25Index.from_nodes(nodes)
+    bundles = [
+        QueryBundle(query_str=query, embedding=vector.tolist())
+        for query, vector in zip(queries, query_vectors)
+    ]
+
+    recall = {"dense": {}, "hybrid": {}}
+    for k in ks:
+        dense = index.as_retriever(similarity_top_k=k).retrieve_batch(query_vectors)
+        hybrid = HybridRetriever(
+            index.as_retriever(similarity_top_k=4 * k),
+            lexical,
+            similarity_top_k=k,
+            alpha=alpha,
+            candidate_k=4 * k,
+        )
+        recall["dense"][k] = labelled_recall(
+            relevant, [[int(r.node.node_id) for r in results] for results in dense]
+        )
+        recall["hybrid"][k] = labelled_recall(
+            relevant,
+            [[int(r.node.node_id) for r in hybrid.retrieve(bundle)] for bundle in bundles],
+        )
+    return recall
+
+
+def recommend_top_k(recall: Dict[str, Dict[int, float]], baseline_k: int) -> int:
+    """
+    Returns the smallest k at which hybrid recall matches dense recall at
+    `baseline_k`, or `baseline_k` if no smaller k does.
+    """
+    target = recall["dense"][baseline_k]
+    for k in sorted(recall["hybrid"]):
+        if k <= baseline_k and recall["hybrid"][k] >= target:
+            return k
+    return baseline_k
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--chunks", type=int, default=200)
+    arg_parser.add_argument("--questions", type=int, default=100)
+    arg_parser.add_argument("--baseline-k", type=int, default=5)
+    arg_parser.add_argument("--max-k", type=int, default=8)
+    arg_parser.add_argument("--alpha", type=float, default=0.5)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    from pdfparse.models import registry
+
+    texts, queries, relevant = make_labelled_set(
+        args.chunks, args.questions, seed=args.seed
+    )
+    embed_model = registry.get("embed_model")
+    chunk_vectors = np.array(embed_model.embed_documents(texts), dtype=np.float32)
+    query_vectors = np.array(embed_model.embed_queries(queries), dtype=np.float32)
+
+    ks = range(1, max(args.max_k, args.baseline_k) + 1)
+    recall = compare_recall(
+        texts, queries, relevant, chunk_vectors, query_vectors, ks, args.alpha
+    )
+
+    print(f"{len(texts)} chunks, {len(queries)} labelled questions, alpha {args.alpha}")
+    print(f"{'k':>3}{'dense':>10}{'hybrid':>10}")
+    for k in ks:
+        print(f"{k:>3}{recall['dense'][k]:>10.3f}{recall['hybrid'][k]:>10.3f}")
+    print(
+        f"hybrid matches dense recall at k={args.baseline_k} "
+        f"({recall['dense'][args.baseline_k]:.3f}) from "
+        f"k={recommend_top_k(recall, args.baseline_k)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Accuracy-parity check and throughput benchmark of the table detector backends.
+
+Every page of the fixture PDFs is rendered once, run through each backend, and
+the detections of every backend are compared against the PyTorch reference.
+The vector-graphics table prefilter is checked against the same reference: its
+recall is the share of pages with detected tables that it would not have skipped.
+
+Usage:
+    python -m pdfparse.benchmark_tables fixtures/*.pdf --backends torch int8 onnx
+"""
+import argparse
+import logging
+import tempfile
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import fitz  # PyMuPDF
+import torch
+
+from pdfparse.models import TABLE_BACKENDS, registry
+from pdfparse.parse import ResearchPaperParser
+from pdfparse.raster import PageRaster
+
+logger = logging.getLogger(__name__)
+
+
+def render_fixture_pages(
+    pdf_paths: Sequence[str], zoom: float = 2.0, max_pages: int = None
+) -> List[PageRaster]:
+    rasters = []
+    for pdf_path in pdf_paths:
+        document = fitz.open(pdf_path)
+        for page in document:
+            if max_pages is not None and len(rasters) >= max_pages:
+                return rasters
+            rasters.append(PageRaster.render(page, zoom))
+    return rasters
+
+
+def run_backend(
+    backend: str, rasters: List[PageRaster], batch_size: int, pdf_path: str
+) -> Tuple[List[List[Dict]], float]:
+    """
+    Detects the tables of every raster with the given backend.
+
+    Returns:
+        the detections per page and the wall time in seconds, excluding
+        model loading and a warm-up batch
+    """
+    parser = ResearchPaperParser(
+        pdf_path,
+        output_dir=tempfile.gettempdir(),
+        table_batch_size=batch_size,
+        table_backend=backend,
+    )
+    registry.warm(["table_processor", TABLE_BACKENDS[backend]])
+    parser.detect_tables_batch(rasters[:batch_size])
+
+    detections = []
+    start_time = time.perf_counter()
+    for batch_start in range(0, len(rasters), batch_size):
+        detections.extend(
+            parser.detect_tables_batch(rasters[batch_start : batch_start + batch_size])
+        )
+    return detections, time.perf_counter() - start_time
+
+
+def prefilter_pages(
+    pdf_paths: Sequence[str], max_pages: int = None
+) -> Tuple[List[bool], float]:
+    """
+    Runs the table prefilter over the fixture pages, in the same order as
+    `render_fixture_pages`.
+
+    Returns:
+        whether each page is a table candidate, and the wall time in seconds
+    """
+    flags = []
+    start_time = time.perf_counter()
+    for pdf_path in pdf_paths:
+        parser = ResearchPaperParser(pdf_path, output_dir=tempfile.gettempdir())
+        parser.load_pdf()
+        for page_num in range(len(parser.document)):
+            if max_pages is not None and len(flags) >= max_pages:
+                return flags, time.perf_counter() - start_time
+            flags.append(parser.may_contain_table(page_num))
+    return flags, time.perf_counter() - start_time
+
+
+def prefilter_recall(
+    flags: List[bool], detections: List[List[Dict]]
+) -> Dict[str, float]:
+    """
+    Returns the recall of the prefilter on pages where full detection found a
+    table, and the share of pages it skips.
+    """
+    table_pages = [flag for flag, tables in zip(flags, detections) if tables]
+    return {
+        "recall": sum(table_pages) / len(table_pages) if table_pages else 1.0,
+        "skip_rate": flags.count(False) / len(flags) if flags else 0.0,
+    }
+
+
+def box_iou(a: List[int], b: List[int]) -> float:
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[2], b[2]), min(a[3], b[3])
+    intersection = max(0, x1 - x0) * max(0, y1 - y0)
+    union = (
+        (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    )
+    return intersection / union if union > 0 else 0.0
+
+
+def compare_detections(
+    reference: List[List[Dict]],
+    candidate: List[List[Dict]],
+    iou_threshold: float = 0.8,
+) -> Dict[str, float]:
+    """
+    Greedily matches the candidate tables of every page to the reference tables.
+
+    Returns:
+        recall and precision of the candidate against the reference, the mean IoU
+        of matched boxes and the largest confidence difference between matches
+    """
+    matched = 0
+    ious = []
+    confidence_delta = 0.0
+    for ref_tables, cand_tables in zip(reference, candidate):
+        unmatched = list(cand_tables)
+        for ref in ref_tables:
+            scored = [(box_iou(ref["box"], cand["box"]), cand) for cand in unmatched]
+            if not scored:
+                continue
+            iou, best = max(scored, key=lambda item: item[0])
+            if iou >= iou_threshold:
+                matched += 1
+                ious.append(iou)
+                confidence_delta = max(
+                    confidence_delta, abs(ref["confidence"] - best["confidence"])
+                )
+                unmatched.remove(best)
+
+    total_reference = sum(len(tables) for tables in reference)
+    total_candidate = sum(len(tables) for tables in candidate)
+    return {
+        "recall": matched / total_reference if total_reference else 1.0,
+        "precision": matched / total_candidate if total_candidate else 1.0,
+        "mean_iou": sum(ious) / len(ious) if ious else 1.0,
+        "max_confidence_delta": confidence_delta,
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("pdfs", nargs="+", help="fixture PDF files")
+    arg_parser.add_argument(
+        "--backends", nargs="+", default=list(TABLE_BACKENDS), choices=TABLE_BACKENDS
+    )
+    arg_parser.add_argument("--batch-size", type=int, default=4)
+    arg_parser.add_argument("--max-pages", type=int, default=None)
+    arg_parser.add_argument("--threads", type=int, default=None)
+    arg_parser.add_argument("--iou-threshold", type=float, default=0.8)
+    args = arg_parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    rasters = render_fixture_pages(args.pdfs, max_pages=args.max_pages)
+    print(f"Rendered {len(rasters)} fixture pages")
+
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    reference = None
+    for backend in backends:
+        detections, seconds = run_backend(
+            backend, rasters, args.batch_size, args.pdfs[0]
+        )
+        line = f"{backend:>6}: {len(rasters) / seconds:.2f} pages/s"
+        if reference is None:
+            reference = detections
+            flags, prefilter_seconds = prefilter_pages(args.pdfs, args.max_pages)
+            check = prefilter_recall(flags, reference)
+            print(
+                f"prefilter: recall {check['recall']:.3f}, "
+                f"skips {check['skip_rate']:.1%} of pages, "
+                f"{len(flags) / max(prefilter_seconds, 1e-9):.1f} pages/s"
+            )
+        else:
+            parity = compare_detections(reference, detections, args.iou_threshold)
+            line += (
+                f", recall {parity['recall']:.3f}, precision {parity['precision']:.3f}, "
+                f"mean IoU {parity['mean_iou']:.3f}, "
+                f"max confidence delta {parity['max_confidence_delta']:.3f}"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
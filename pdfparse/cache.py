@@ -0,0 +1,150 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "PRAGATI_PARSE_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "pragati", "parse"),
+)
+DEFAULT_MAX_BYTES = 512 * 2**20
+
+
+def file_digest(path: str, chunk_size: int = 2**20) -> str:
+    """
+    Computes the SHA-256 digest of a file's content, reading it in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    A content-addressed, size-bounded on-disk cache of parse results.
+    Entries are keyed by the PDF's content hash together with the parser name,
+    parser version and parsing options, and are stored as gzipped JSON.
+    When the cache outgrows `max_bytes` the least recently used entries are evicted.
+    """
+
+    def __init__(
+        self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(
+        self, pdf_path: str, parser: str, version: str, options: Dict[str, Any] = None
+    ) -> str:
+        """
+        Builds the cache key of a PDF for a given parser configuration.
+
+        Args:
+            pdf_path: path to the PDF file
+            parser: name of the parser producing the results
+            version: version of that parser's output format
+            options: any option that changes the parser's output
+
+        Returns:
+            str: the hex digest identifying the cache entry
+        """
+        fingerprint = json.dumps(
+            {
+                "content": file_digest(pdf_path),
+                "parser": parser,
+                "version": version,
+                "options": options or {},
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json.gz")
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns the cached value for `key`, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+            self.hits += 1
+            logger.info(f"Parse cache hit: {key[:12]}")
+            return value
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"Discarding unreadable parse cache entry {key[:12]}: {str(e)}")
+            self.misses += 1
+            self.delete(key)
+            return None
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Stores a JSON-serialisable value under `key`, then enforces the size bound.
+        """
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(value, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+            logger.info(f"Stored parse cache entry {key[:12]}")
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Failed to store parse cache entry {key[:12]}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.evict()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def size(self) -> int:
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def evict(self) -> int:
+        """
+        Removes least recently used entries until the cache fits in `max_bytes`.
+
+        Returns:
+            int: the number of bytes reclaimed
+        """
+        with self._lock:
+            entries = [(entry, entry.stat()) for entry in self._entries()]
+            total = sum(stat.st_size for _, stat in entries)
+            reclaimed = 0
+            for entry, stat in sorted(entries, key=lambda item: item[1].st_mtime):
+                if total - reclaimed <= self.max_bytes:
+                    break
+                try:
+                    os.remove(entry.path)
+                    reclaimed += stat.st_size
+                except FileNotFoundError:
+                    pass
+            if reclaimed:
+                logger.info(f"Evicted {reclaimed} bytes from the parse cache")
+            return reclaimed
+
+    def _entries(self):
+        with os.scandir(self.cache_dir) as it:
+            return [entry for entry in it if entry.name.endswith(".json.gz")]
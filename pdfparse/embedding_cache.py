@@ -0,0 +1,199 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialised within the process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBED_CACHE_DIR = os.getenv(
+    "PRAGATI_EMBED_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "pragati", "embeddings"),
+)
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    A persistent cache of the embeddings of one model, keyed by the hash of the
+    embedded text. Vectors are appended as raw float32 rows to `vectors.f32`, which
+    is read through a memory map, and `keys.txt` is a sidecar index mapping every
+    text hash to its row. Rows are written before their keys, so an interrupted
+    write never leaves a key pointing at a missing vector.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str = DEFAULT_EMBED_CACHE_DIR):
+        self.model_name = model_name
+        self.cache_dir = os.path.join(
+            cache_dir, hashlib.sha256(model_name.encode("utf-8")).hexdigest()[:16]
+        )
+        self.hits = 0
+        self.misses = 0
+        self.dim: Optional[int] = None
+        self._rows: Dict[str, int] = {}
+        self._keys_offset = 0
+        self._vectors = None
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_meta()
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.cache_dir, "vectors.f32")
+
+    @property
+    def _keys_path(self) -> str:
+        return os.path.join(self.cache_dir, "keys.txt")
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.cache_dir, "meta.json")
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _load_meta(self) -> None:
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+
+    def _refresh(self) -> None:
+        """
+        Reads the keys appended since the last call, by this or another process,
+        and remaps the vectors if the file has grown.
+        """
+        if not os.path.exists(self._keys_path):
+            return
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # a key still being written
+                digest, row = line.split()
+                self._rows[digest.decode("ascii")] = int(row)
+                self._keys_offset += len(line)
+
+        rows = os.path.getsize(self._vectors_path) // (4 * self.dim)
+        if rows and (self._vectors is None or len(self._vectors) < rows):
+            self._vectors = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim)
+            )
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Returns the cached vector of every text, or None where it is not cached,
+        and counts the hits and misses.
+        """
+        digests = [text_digest(text) for text in texts]
+        with self._lock:
+            if self.dim is None:
+                self._load_meta()
+            if self.dim is not None:
+                self._refresh()
+            results = []
+            for digest in digests:
+                row = self._rows.get(digest)
+                results.append(None if row is None else np.array(self._vectors[row]))
+            found = sum(result is not None for result in results)
+            self.hits += found
+            self.misses += len(results) - found
+        return results
+
+    def put_many(self, texts: List[str], vectors: np.ndarray) -> None:
+        """
+        Appends the vectors of the given texts to the cache.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(texts) == 0:
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"model": self.model_name, "dim": self.dim}, f)
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(
+                    f"Expected {self.dim}-dimensional vectors, got {vectors.shape[1]}"
+                )
+
+            with open(self._vectors_path, "ab") as vectors_file, open(
+                self._keys_path, "a", encoding="utf-8"
+            ) as keys_file:
+                if fcntl is not None:
+                    fcntl.flock(vectors_file, fcntl.LOCK_EX)
+                try:
+                    first_row = vectors_file.seek(0, os.SEEK_END) // (4 * self.dim)
+                    vectors_file.write(vectors.tobytes())
+                    vectors_file.flush()
+                    keys_file.write(
+                        "".join(
+                            f"{text_digest(text)} {first_row + i}\n"
+                            for i, text in enumerate(texts)
+                        )
+                    )
+                    keys_file.flush()
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(vectors_file, fcntl.LOCK_UN)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "entries": len(self._rows),
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps a LangChain embedding model so that documents are only embedded when
+    their text is not in the EmbeddingCache yet; all misses of a call are
+    embedded together in one batch. Queries are passed through uncached.
+    """
+
+    def __init__(self, model: Embeddings, cache: EmbeddingCache):
+        self.model = model
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.cache.get_many(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            # Identical texts within one call are embedded once
+            unique = list(dict.fromkeys(texts[i] for i in missing))
+            embedded = np.array(self.model.embed_documents(unique), dtype=np.float32)
+            self.cache.put_many(unique, embedded)
+            by_text = dict(zip(unique, embedded))
+            for i in missing:
+                vectors[i] = by_text[texts[i]]
+        logger.info(
+            f"Embedded {len(texts)} texts: {len(texts) - len(missing)} cached, "
+            f"{len(missing)} computed (hit rate {self.cache.hit_rate:.1%} overall)"
+        )
+        return [vector.tolist() for vector in vectors]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.model.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds several queries in one batch, bypassing the cache: queries are rarely
+        repeated, and caching them would grow the cache without bound and skew the
+        chunk hit rate.
+        """
+        return self.model.embed_documents(texts)
@@ -0,0 +1,517 @@
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import chromadb
+from llama_index.core import VectorStoreIndex
+from llama_index.core.schema import NodeWithScore
+from llama_index.core.storage.storage_context import StorageContext
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+from llama_index.vector_stores.chroma import ChromaVectorStore
+
+from pdfparse.lexical import BM25Index
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHROMA_PATH = "./chroma_db"
+INDEX_VERSION = "1"
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 2**30
+# Collections used this recently may be open in another process and are kept
+DEFAULT_MIN_AGE = 3600
+# Builders refresh a heartbeat in the metadata of the collection they are
+# building, and an incomplete collection whose heartbeat is older than the grace
+# period is taken to be left over from a builder that died
+BUILD_HEARTBEAT_INTERVAL = 10.0
+BUILD_GRACE_PERIOD = 600
+BUILD_POLL_INTERVAL = 1.0
+# Collections created by this module, and by the per-call naming it replaced
+MANAGED_PREFIXES = ("pragati_", "Randomness_")
+
+_clients: Dict[Tuple[str, int], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(path: str = DEFAULT_CHROMA_PATH):
+    """
+    Returns the process-wide Chroma client of `path`, creating it on first use.
+    Opening a PersistentClient per call re-reads the SQLite catalogue every time.
+    """
+    key = (os.path.abspath(path), os.getpid())
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = chromadb.PersistentClient(path=path)
+            _clients[key] = client
+        return client
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+def index_key(
+    doc_digest: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    embed_model_name: str,
+    options: Dict[str, Any] = None,
+) -> str:
+    """
+    Builds the key of a document's vector index.
+
+    Args:
+        doc_digest: the content hash of the document
+        chunk_size: the chunk size the document is split with
+        chunk_overlap: the overlap between consecutive chunks
+        embed_model_name: the embedding model the chunks are embedded with
+        options: anything else that changes the indexed chunks, e.g. parser options
+
+    Returns:
+        str: the hex digest identifying the index
+    """
+    fingerprint = json.dumps(
+        {
+            "content": doc_digest,
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "embed_model": embed_model_name,
+            "version": INDEX_VERSION,
+            "options": options or {},
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+
+class ChromaRetriever:
+    """
+    Retrieves from a Chroma-backed VectorStoreIndex through its own retriever, and
+    answers several embedded queries with a single `collection.query`, scored with
+    the same similarity as ChromaVectorStore.
+    """
+
+    def __init__(self, index: VectorStoreIndex, similarity_top_k: int = 5):
+        self.index = index
+        self.similarity_top_k = similarity_top_k
+        self._retriever = index.as_retriever(similarity_top_k=similarity_top_k)
+
+    def retrieve(self, query) -> List[NodeWithScore]:
+        """
+        Args:
+            query: the query text, or a QueryBundle carrying its embedding
+        """
+        return self._retriever.retrieve(query)
+
+    def retrieve_batch(
+        self, query_vectors, query_texts: List[str] = None
+    ) -> List[List[NodeWithScore]]:
+        """
+        Retrieves the nodes of several embedded queries in one query of the
+        collection. The query texts are not needed and only accepted for interface
+        parity with the other retrievers.
+        """
+        collection = self.index.vector_store.client
+        top_k = min(self.similarity_top_k, collection.count())
+        if top_k == 0:
+            return [[] for _ in query_vectors]
+        result = collection.query(
+            query_embeddings=[[float(v) for v in vector] for vector in query_vectors],
+            n_results=top_k,
+            include=["documents", "metadatas", "distances"],
+        )
+        batch = []
+        for texts, metadatas, distances in zip(
+            result["documents"], result["metadatas"], result["distances"]
+        ):
+            results = []
+            for text, metadata, distance in zip(texts, metadatas, distances):
+                node = metadata_dict_to_node(metadata)
+                node.set_content(text)
+                results.append(NodeWithScore(node=node, score=math.exp(-distance)))
+            batch.append(results)
+        return batch
+
+
+class IndexManager:
+    """
+    Keeps one vector index per document, chunking configuration and embedding model.
+    Indexes are persisted as Chroma collections named after their key, so the first
+    RAG built for a paper embeds it and every later one, in this process or the
+    next, reopens the stored vectors without re-embedding. Opened indexes are also
+    kept in memory and shared by every RAG of the process.
+
+    Collections record when they were last used, and `collect_garbage` drops those
+    unused for longer than a TTL, then the least recently used ones until the
+    store fits a disk-size cap. It runs after every build. Collections used within
+    the last `min_age` seconds are always kept, since another process may be
+    querying them.
+
+    A process claims a build by creating the collection, marked incomplete, before
+    chunking the document; other processes wait for the claimed build to complete
+    for as long as its builder keeps refreshing a heartbeat.
+
+    Next to every vector index, a BM25 inverted index of the same chunks is built
+    and saved for hybrid retrieval, see `get_lexical`.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CHROMA_PATH,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        min_age: float = DEFAULT_MIN_AGE,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.min_age = min_age
+        self.builds = 0
+        self.reopens = 0
+        self._indexes: Dict[str, VectorStoreIndex] = {}
+        self._lexical: Dict[str, BM25Index] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        return get_client(self.path)
+
+    @staticmethod
+    def collection_name(key: str) -> str:
+        return f"pragati_{key[:48]}"
+
+    def lexical_path(self, key: str) -> str:
+        return os.path.join(self.path, "lexical", self.collection_name(key))
+
+    def get_or_build(
+        self, key: str, build_nodes: Callable[[], List], embed_model: Any
+    ) -> VectorStoreIndex:
+        """
+        Returns the index stored under `key`, building it on first use.
+        Concurrent first calls block until a single build has completed.
+
+        Args:
+            key: the index key, see `index_key`
+            build_nodes: a zero-argument callable returning the nodes to index,
+                         only called when the index has to be built
+            embed_model: the embedding model of the index
+
+        Returns:
+            VectorStoreIndex: the index
+        """
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
+
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            index = self._indexes.get(key)
+            if index is None:
+                nodes = []
+
+                def build_and_keep_nodes():
+                    nodes.extend(build_nodes())
+                    return nodes
+
+                index = self._open(key, embed_model)
+                built = False
+                while index is None:
+                    index = self._build(key, build_and_keep_nodes, embed_model)
+                    if index is None:
+                        # Another process claimed the build first
+                        index = self._open(key, embed_model)
+                    else:
+                        built = True
+                if built:
+                    self._save_lexical(key, BM25Index.from_nodes(nodes))
+                self._indexes[key] = index
+                if built:
+                    self.collect_garbage()
+        return index
+
+    def retriever(self, index: VectorStoreIndex, similarity_top_k: int = 5):
+        """
+        Returns a retriever of an index opened by this manager, with a
+        `retrieve_batch` for several embedded queries at once.
+        """
+        return ChromaRetriever(index, similarity_top_k)
+
+    def _open(self, key: str, embed_model: Any):
+        name = self.collection_name(key)
+        try:
+            collection = self.client.get_collection(name)
+        except Exception:
+            # Chroma raises ValueError or NotFoundError depending on its version
+            return None
+
+        metadata = dict(collection.metadata or {})
+        if not metadata.get("complete"):
+            metadata = self._wait_for_build(name, metadata)
+            if metadata is None:
+                return None
+            collection = self.client.get_collection(name)
+        metadata["last_used"] = time.time()
+        collection.modify(metadata=metadata)
+
+        vector_store = ChromaVectorStore(chroma_collection=collection)
+        index = VectorStoreIndex.from_vector_store(vector_store, embed_model=embed_model)
+        self.reopens += 1
+        logger.info(f"Reopened index {name} with {collection.count()} vectors")
+        return index
+
+    @staticmethod
+    def _last_heartbeat(metadata: Dict) -> float:
+        return metadata.get("heartbeat", metadata.get("created", 0.0))
+
+    def _wait_for_build(self, name: str, metadata: Dict):
+        """
+        Waits for another process to finish building the collection `name`. As
+        long as its builder keeps the heartbeat fresh the wait is unbounded; a
+        collection whose heartbeat is older than BUILD_GRACE_PERIOD seconds is
+        taken to be left over from a builder that died, and dropped.
+
+        Returns:
+            the metadata of the completed collection, or None if it was dropped
+        """
+        logger.info(f"Waiting for index collection {name} to be built")
+        while time.time() - self._last_heartbeat(metadata) <= BUILD_GRACE_PERIOD:
+            time.sleep(BUILD_POLL_INTERVAL)
+            try:
+                metadata = dict(self.client.get_collection(name).metadata or {})
+            except Exception:
+                return None  # the builder failed and dropped it
+            if metadata.get("complete"):
+                return metadata
+
+        logger.warning(f"Dropping incomplete index collection {name}")
+        try:
+            self.client.delete_collection(name)
+        except Exception:
+            pass  # another waiter dropped it first
+        return None
+
+    def _claim(self, name: str):
+        """
+        Creates the empty collection `name`, marked incomplete, as the claim to
+        build it. Chroma refuses to create a collection that already exists, so
+        exactly one process wins the claim.
+
+        Returns:
+            the claimed collection, or None if another process claimed it first
+        """
+        now = time.time()
+        try:
+            return self.client.create_collection(
+                name, metadata={"complete": 0, "created": now, "heartbeat": now}
+            )
+        except Exception:
+            # Chroma raises ValueError or UniqueConstraintError depending on its version
+            return None
+
+    def _build(
+        self, key: str, build_nodes: Callable[[], List], embed_model: Any
+    ):
+        """
+        Claims the collection of `key`, then chunks and embeds the document into it
+        while a background thread refreshes the claim's heartbeat. A failed build
+        drops its collection, so waiting processes can claim it in turn.
+
+        Returns:
+            the built index, or None if another process claimed the build first
+        """
+        name = self.collection_name(key)
+        collection = self._claim(name)
+        if collection is None:
+            return None
+
+        metadata = dict(collection.metadata or {})
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(BUILD_HEARTBEAT_INTERVAL):
+                metadata["heartbeat"] = time.time()
+                collection.modify(metadata=dict(metadata))
+
+        heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+        heartbeat_thread.start()
+        try:
+            nodes = build_nodes()
+            vector_store = ChromaVectorStore(chroma_collection=collection)
+            storage_context = StorageContext.from_defaults(vector_store=vector_store)
+            index = VectorStoreIndex(
+                nodes=nodes, storage_context=storage_context, embed_model=embed_model
+            )
+        except BaseException:
+            stop.set()
+            heartbeat_thread.join()
+            self.client.delete_collection(name)
+            raise
+        stop.set()
+        heartbeat_thread.join()
+
+        # Only a fully written collection is ever reopened
+        collection.modify(
+            metadata={"complete": 1, "nodes": len(nodes), "last_used": time.time()}
+        )
+        self.builds += 1
+        logger.info(f"Built index {name} with {len(nodes)} nodes")
+        return index
+
+    def get_lexical(self, key: str, build_nodes: Callable[[], List]) -> BM25Index:
+        """
+        Returns the BM25 index stored under `key`. It is normally saved when the
+        vector index is built; for indexes built before that, it is built from
+        `build_nodes()` on first use, which chunks the document without embedding it.
+        """
+        lexical = self._lexical.get(key)
+        if lexical is not None:
+            return lexical
+
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            lexical = self._lexical.get(key)
+            if lexical is None:
+                if os.path.isdir(self.lexical_path(key)):
+                    lexical = BM25Index.load(self.lexical_path(key))
+                else:
+                    lexical = BM25Index.from_nodes(build_nodes())
+                    self._save_lexical(key, lexical)
+                self._lexical[key] = lexical
+        return lexical
+
+    def _save_lexical(self, key: str, lexical: BM25Index) -> None:
+        os.makedirs(os.path.dirname(self.lexical_path(key)), exist_ok=True)
+        lexical.save(self.lexical_path(key))
+        self._lexical[key] = lexical
+        logger.info(f"Built BM25 index of {len(lexical)} chunks, {len(lexical.vocab)} terms")
+
+    def invalidate(self, key: str) -> None:
+        """
+        Drops the index stored under `key`, in memory and on disk.
+        """
+        with self._lock:
+            self._indexes.pop(key, None)
+            self._lexical.pop(key, None)
+        shutil.rmtree(self.lexical_path(key), ignore_errors=True)
+        try:
+            self.client.delete_collection(self.collection_name(key))
+        except Exception:
+            pass
+
+    def collect_garbage(
+        self, ttl: float = None, max_bytes: int = None, min_age: float = None
+    ) -> Dict:
+        """
+        Deletes the managed collections unused for longer than `ttl` seconds, then
+        the least recently used ones until the store is under `max_bytes`.
+        Collections opened by this manager, or used by any process within the last
+        `min_age` seconds, are never deleted. The size of each collection is
+        estimated as its share of the stored vectors.
+
+        Returns:
+            Dict: the deleted collections, the bytes reclaimed on disk and the
+            store size after collection
+        """
+        ttl = self.ttl if ttl is None else ttl
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        min_age = self.min_age if min_age is None else min_age
+        size_before = directory_size(self.path)
+        in_use = {self.collection_name(key) for key in self._indexes}
+
+        collections = []
+        for entry in self.client.list_collections():
+            # Chroma returns names rather than collections from 0.6 on
+            name = entry if isinstance(entry, str) else entry.name
+            if not name.startswith(MANAGED_PREFIXES) or name in in_use:
+                continue
+            collection = self.client.get_collection(name)
+            metadata = collection.metadata or {}
+            # Collections still being built have no last use yet
+            last_used = metadata.get("last_used", self._last_heartbeat(metadata))
+            collections.append((last_used, name, collection.count()))
+        collections.sort()
+
+        total_vectors = sum(count for _, _, count in collections) or 1
+        estimated_size = size_before
+        now = time.time()
+        deleted = []
+        for last_used, name, count in collections:
+            if now - last_used <= ttl and estimated_size <= max_bytes:
+                break
+            if now - last_used <= min_age:
+                break
+            self.client.delete_collection(name)
+            shutil.rmtree(os.path.join(self.path, "lexical", name), ignore_errors=True)
+            estimated_size -= size_before * count / total_vectors
+            deleted.append(name)
+
+        size_after = directory_size(self.path)
+        report = {
+            "deleted": deleted,
+            "reclaimed_bytes": max(0, size_before - size_after),
+            "size_bytes": size_after,
+        }
+        if deleted:
+            logger.info(
+                f"Deleted {len(deleted)} index collections, reclaimed "
+                f"{report['reclaimed_bytes'] / 2**20:.1f} MiB "
+                f"({size_after / 2**20:.1f} MiB left)"
+            )
+        return report
+
+
+default_manager = IndexManager()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Garbage-collects the stored vector indexes."
+    )
+    arg_parser.add_argument("--path", default=DEFAULT_CHROMA_PATH)
+    arg_parser.add_argument("--ttl-days", type=float, default=DEFAULT_TTL / 86400)
+    arg_parser.add_argument("--max-mib", type=float, default=DEFAULT_MAX_BYTES / 2**20)
+    arg_parser.add_argument(
+        "--min-age-hours",
+        type=float,
+        default=DEFAULT_MIN_AGE / 3600,
+        help="never delete collections used more recently than this",
+    )
+    args = arg_parser.parse_args()
+
+    manager = IndexManager(args.path)
+    report = manager.collect_garbage(
+        ttl=args.ttl_days * 86400,
+        max_bytes=int(args.max_mib * 2**20),
+        min_age=args.min_age_hours * 3600,
+    )
+    print(
+        f"Deleted {len(report['deleted'])} collections, reclaimed "
+        f"{report['reclaimed_bytes'] / 2**20:.1f} MiB, "
+        f"{report['size_bytes'] / 2**20:.1f} MiB left"
+    )
+    for name in report["deleted"]:
+        print(f"  {name}")
+
+
+if __name__ == "__main__":
+    main()
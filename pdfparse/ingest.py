@@ -0,0 +1,337 @@
+"""
+Batch ingestion of a directory or manifest of PDFs with PDFParser.
+
+Every PDF is parsed in a pool of worker processes, each of which streams the text
+of its file straight to `<output_dir>/<relative path>.txt`, so outputs are written
+in parallel and never held in memory whole. Files whose output is newer than the
+PDF are skipped, files that fail or exceed the per-file timeout are retried, and a
+throughput report is printed at the end. The timeout is enforced by the parent
+process, which kills and replaces a worker stuck on a file, even inside MuPDF or
+tesseract.
+
+Usage:
+    python -m pdfparse.ingest papers/ --output-dir texts/ --workers 8 --timeout 300
+    python -m pdfparse.ingest manifest.txt --output-dir texts/
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from multiprocessing.connection import wait
+from typing import Dict, List, Tuple
+
+from pdfparse.parser import PDFParser
+
+logger = logging.getLogger(__name__)
+
+
+def collect_pdfs(source: str) -> Tuple[List[str], str]:
+    """
+    Lists the PDFs to ingest: every PDF under a directory, or every path listed in a
+    manifest file (one per line; blank lines and lines starting with # are ignored,
+    relative paths are resolved against the manifest's directory).
+
+    Returns:
+        the PDF paths, and the root their output paths are made relative to
+    """
+    if os.path.isdir(source):
+        pdf_paths = sorted(
+            os.path.join(dirpath, name)
+            for dirpath, _, filenames in os.walk(source)
+            for name in filenames
+            if name.lower().endswith(".pdf")
+        )
+        return pdf_paths, source
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding="utf-8") as f:
+        entries = [line.strip() for line in f]
+    pdf_paths = [
+        os.path.normpath(os.path.join(base_dir, entry))
+        for entry in entries
+        if entry and not entry.startswith("#")
+    ]
+    root = os.path.commonpath([os.path.dirname(p) for p in pdf_paths]) if pdf_paths else base_dir
+    return pdf_paths, root
+
+
+def output_path_for(pdf_path: str, root: str, output_dir: str) -> str:
+    relative = os.path.relpath(pdf_path, root)
+    return os.path.join(output_dir, os.path.splitext(relative)[0] + ".txt")
+
+
+def is_up_to_date(pdf_path: str, output_path: str) -> bool:
+    return (
+        os.path.exists(output_path)
+        and os.path.getmtime(output_path) >= os.path.getmtime(pdf_path)
+    )
+
+
+def _tmp_path(output_path: str, pid: int) -> str:
+    return f"{output_path}.{pid}.tmp"
+
+
+def ingest_file(pdf_path: str, output_path: str, ocr_workers: int = 1) -> Dict:
+    """
+    Parses one PDF and streams its text to `output_path`. The text is written to a
+    temporary file first, so an interrupted run never leaves a partial output that
+    would later be mistaken for an up-to-date one.
+
+    Returns:
+        Dict: the file's path, status, page and OCR page counts, run time and error
+    """
+    start_time = time.time()
+    result = {"path": pdf_path, "status": "ok", "pages": 0, "ocr_pages": 0, "error": None}
+    tmp_path = _tmp_path(output_path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        # Files are already spread over processes, so each parses in-process
+        parser = PDFParser(pdf_path, workers=1, ocr_workers=ocr_workers)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for page_num, text, used_ocr in parser.iter_pages():
+                if page_num > 0:
+                    f.write("\n\n")
+                f.write(text)
+                result["pages"] += 1
+                result["ocr_pages"] += int(used_ocr)
+        os.replace(tmp_path, output_path)
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    result["seconds"] = time.time() - start_time
+    return result
+
+
+def _worker_loop(conn, ocr_workers: int) -> None:
+    """
+    Serves (pdf_path, output_path) tasks sent over `conn` until it receives None.
+    """
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        conn.send(ingest_file(*task, ocr_workers=ocr_workers))
+
+
+class _Worker:
+    """
+    A long-lived ingestion process and the pipe it receives its files over.
+    """
+
+    def __init__(self, context, ocr_workers: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_loop, args=(child_conn, ocr_workers), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.path = None
+        self.output_path = None
+        self.started = 0.0
+
+    def submit(self, path: str, output_path: str) -> None:
+        self.path = path
+        self.output_path = output_path
+        self.started = time.time()
+        self.conn.send((path, output_path))
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+        tmp_path = _tmp_path(self.output_path, self.process.pid)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+def ingest(
+    pdf_paths: List[str],
+    root: str,
+    output_dir: str,
+    workers: int = None,
+    timeout: float = None,
+    retries: int = 1,
+    ocr_workers: int = 1,
+    force: bool = False,
+) -> Dict:
+    """
+    Ingests a batch of PDFs over a pool of worker processes. The parent tracks
+    when every worker took its file, and a worker that exceeds `timeout` or dies
+    is killed and replaced by a fresh process, so one hung file never stalls the
+    batch.
+
+    Args:
+        pdf_paths: the PDFs to ingest
+        root: the directory output paths are made relative to
+        output_dir: where the text files are written
+        workers: number of worker processes (default: CPU count)
+        timeout: seconds allowed per file and attempt (default: no limit)
+        retries: how many more times a failed or timed-out file is attempted
+        ocr_workers: concurrent OCR calls within each worker
+        force: re-ingest files whose output is already up to date
+
+    Returns:
+        Dict: the per-file results, the skipped files and the wall time
+    """
+    start_time = time.time()
+    jobs = {}
+    skipped = []
+    for pdf_path in pdf_paths:
+        output_path = output_path_for(pdf_path, root, output_dir)
+        if not force and is_up_to_date(pdf_path, output_path):
+            skipped.append(pdf_path)
+        else:
+            jobs[pdf_path] = output_path
+    logger.info(f"Ingesting {len(jobs)} PDFs ({len(skipped)} already up to date)")
+
+    results = {}
+    attempts = dict.fromkeys(jobs, 0)
+    pending = deque(jobs)
+
+    def record(path, result):
+        attempts[path] += 1
+        result["attempts"] = attempts[path]
+        results[path] = result
+        if result["status"] != "ok" and attempts[path] <= retries:
+            logger.warning(f"Retrying {path} after attempt {attempts[path]}: {result['error']}")
+            pending.append(path)
+        elif result["status"] != "ok":
+            logger.error(f"Giving up on {path}: {result['error']}")
+
+    def lost(worker, status, error):
+        return {"path": worker.path, "status": status, "pages": 0, "ocr_pages": 0,
+                "error": error, "seconds": time.time() - worker.started}
+
+    context = multiprocessing.get_context("spawn")
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    idle = [_Worker(context, ocr_workers) for _ in range(workers)]
+    busy = {}
+    try:
+        while pending or busy:
+            while pending and idle:
+                worker = idle.pop()
+                path = pending.popleft()
+                worker.submit(path, jobs[path])
+                busy[worker.conn] = worker
+
+            wait_for = None
+            if timeout:
+                deadline = min(worker.started for worker in busy.values()) + timeout
+                wait_for = max(0.0, deadline - time.time())
+            for conn in wait(list(busy), timeout=wait_for):
+                worker = busy.pop(conn)
+                try:
+                    result = conn.recv()
+                except (EOFError, OSError):
+                    # The worker process itself died, e.g. on a crash in native code
+                    exitcode = worker.process.exitcode
+                    worker.kill()
+                    record(worker.path, lost(worker, "failed", f"worker exited with code {exitcode}"))
+                    idle.append(_Worker(context, ocr_workers))
+                    continue
+                record(worker.path, result)
+                idle.append(worker)
+
+            if timeout:
+                now = time.time()
+                for conn, worker in list(busy.items()):
+                    if now - worker.started >= timeout:
+                        del busy[conn]
+                        worker.kill()
+                        record(worker.path, lost(worker, "timeout", f"timed out after {timeout} seconds"))
+                        idle.append(_Worker(context, ocr_workers))
+    finally:
+        for worker in busy.values():
+            worker.kill()
+        for worker in idle:
+            worker.stop()
+
+    return {
+        "results": [results[path] for path in jobs],
+        "skipped": skipped,
+        "seconds": time.time() - start_time,
+    }
+
+
+def summarize(report: Dict, slowest: int = 5) -> Dict:
+    """
+    Computes the throughput of an ingestion run over the files it parsed.
+    """
+    done = [r for r in report["results"] if r["status"] == "ok"]
+    pages = sum(r["pages"] for r in done)
+    seconds = report["seconds"]
+    return {
+        "documents": len(done),
+        "failed": len(report["results"]) - len(done),
+        "skipped": len(report["skipped"]),
+        "pages": pages,
+        "seconds": seconds,
+        "documents_per_s": len(done) / seconds if seconds else 0.0,
+        "pages_per_s": pages / seconds if seconds else 0.0,
+        "ocr_page_ratio": sum(r["ocr_pages"] for r in done) / pages if pages else 0.0,
+        "slowest": sorted(report["results"], key=lambda r: r["seconds"], reverse=True)[:slowest],
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("source", help="a directory of PDFs or a manifest file")
+    arg_parser.add_argument("--output-dir", required=True)
+    arg_parser.add_argument("--workers", type=int, default=None)
+    arg_parser.add_argument("--timeout", type=float, default=None, help="seconds per file")
+    arg_parser.add_argument("--retries", type=int, default=1)
+    arg_parser.add_argument("--ocr-workers", type=int, default=1)
+    arg_parser.add_argument("--slowest", type=int, default=5)
+    arg_parser.add_argument("--force", action="store_true", help="re-ingest up-to-date files")
+    args = arg_parser.parse_args()
+
+    pdf_paths, root = collect_pdfs(args.source)
+    report = ingest(
+        pdf_paths,
+        root,
+        args.output_dir,
+        workers=args.workers,
+        timeout=args.timeout,
+        retries=args.retries,
+        ocr_workers=args.ocr_workers,
+        force=args.force,
+    )
+    summary = summarize(report, args.slowest)
+
+    print(
+        f"{summary['documents']} documents, {summary['pages']} pages in {summary['seconds']:.2f} s "
+        f"({summary['documents_per_s']:.2f} documents/s, {summary['pages_per_s']:.2f} pages/s)"
+    )
+    print(
+        f"OCR applied to {summary['ocr_page_ratio']:.1%} of pages; "
+        f"{summary['skipped']} skipped as up to date, {summary['failed']} failed"
+    )
+    if summary["slowest"]:
+        print("Slowest files:")
+        for result in summary["slowest"]:
+            print(
+                f"  {result['seconds']:>8.2f} s  {result['pages']:>5} pages  "
+                f"{result['status']:<8} {result['path']}"
+            )
+    for result in report["results"]:
+        if result["status"] != "ok":
+            print(f"FAILED {result['path']} after {result['attempts']} attempts: {result['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+import numpy as np
+from typing import List, Sequence, Tuple
+
+MIN_COLUMN_GAP = 50
+MAX_COLUMN_WIDTH_FRACTION = 0.5
+MIN_COLUMN_AREA_SHARE = 0.25
+
+
+def blocks_to_array(blocks: Sequence[tuple]) -> Tuple[np.ndarray, List[str]]:
+    """
+    Converts the output of `page.get_text("blocks")` into a coordinate array,
+    keeping only the blocks that contain text.
+
+    Args:
+        blocks: the PyMuPDF blocks or words, tuples starting with (x0, y0, x1, y1, text)
+
+    Returns:
+        the (n, 4) float array of block bounding boxes and the list of stripped block texts
+    """
+    text_blocks = [block for block in blocks if block[4].strip()]
+    boxes = np.array(
+        [block[:4] for block in text_blocks], dtype=np.float64
+    ).reshape(-1, 4)
+    texts = [block[4].strip() for block in text_blocks]
+    return boxes, texts
+
+
+def find_column_starts(
+    boxes: np.ndarray,
+    min_gap: float = MIN_COLUMN_GAP,
+    max_width_fraction: float = MAX_COLUMN_WIDTH_FRACTION,
+) -> np.ndarray:
+    """
+    Finds the left edge of every column from the horizontal gaps between blocks.
+    Blocks are swept from left to right, and a new column starts wherever a block
+    begins more than `min_gap` to the right of every block seen so far.
+
+    Blocks wider than `max_width_fraction` of the text width, such as titles,
+    abstracts and full-width captions, are left out of the sweep, since a single
+    one of them would otherwise bridge every gap and merge all the columns. When
+    the remaining blocks hold less than MIN_COLUMN_AREA_SHARE of the text area,
+    the page is taken to be single-column, so that a right-aligned date or page
+    number next to full-width paragraphs does not start a column.
+
+    Args:
+        boxes: the (n, 4) array of block bounding boxes
+        min_gap: the smallest horizontal whitespace that separates two columns
+        max_width_fraction: the widest a block can be, relative to the extent of
+            all the blocks, and still take part in the sweep
+
+    Returns:
+        the sorted array of column start coordinates; the first column starts at 0
+    """
+    if len(boxes) == 0:
+        return np.zeros(1)
+
+    widths = boxes[:, 2] - boxes[:, 0]
+    areas = widths * (boxes[:, 3] - boxes[:, 1])
+    narrow = widths <= max_width_fraction * (boxes[:, 2].max() - boxes[:, 0].min())
+    if areas[narrow].sum() < MIN_COLUMN_AREA_SHARE * areas.sum():
+        return np.zeros(1)
+    boxes = boxes[narrow]
+
+    order = np.argsort(boxes[:, 0], kind="stable")
+    x0 = boxes[order, 0]
+    reach = np.maximum.accumulate(boxes[order, 2])
+
+    splits = np.flatnonzero(x0[1:] - reach[:-1] > min_gap) + 1
+    return np.concatenate(([0.0], x0[splits]))
+
+
+def spanning_blocks(boxes: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Finds the blocks that run across a column boundary, e.g. a title above two
+    columns.
+
+    Returns:
+        the boolean mask of spanning blocks
+    """
+    inner = starts[1:]
+    if len(inner) == 0:
+        return np.zeros(len(boxes), dtype=bool)
+    crosses = (boxes[:, 0, None] < inner - MIN_COLUMN_GAP / 2) & (
+        boxes[:, 2, None] > inner
+    )
+    return crosses.any(axis=1)
+
+
+def column_bounds(
+    boxes: np.ndarray, page_width: float, min_gap: float = MIN_COLUMN_GAP
+) -> List[Tuple[float, float]]:
+    """
+    Computes the (left, right) extent of every column on a page. Blocks spanning
+    several columns do not widen the column they start in.
+
+    Args:
+        boxes: the (n, 4) array of block bounding boxes
+        page_width: the width of the page
+        min_gap: the smallest horizontal whitespace that separates two columns
+
+    Returns:
+        the list of (left, right) tuples, from the leftmost column to the rightmost
+    """
+    starts = find_column_starts(boxes, min_gap)
+    if len(starts) == 1:
+        return [(0, page_width)]
+
+    boxes = boxes[~spanning_blocks(boxes, starts)]
+    labels = assign_columns(boxes, starts)
+    rights = np.zeros(len(starts))
+    np.maximum.at(rights, labels, boxes[:, 2])
+    rights[-1] = page_width
+    return [(float(left), float(right)) for left, right in zip(starts, rights)]
+
+
+def assign_columns(boxes: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Assigns every block to the column in which its left edge falls.
+
+    Returns:
+        the array of column indices, one per block
+    """
+    labels = np.searchsorted(starts, boxes[:, 0], side="right") - 1
+    return np.maximum(labels, 0)
+
+
+def order_blocks(
+    boxes: np.ndarray, starts: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Orders blocks column by column, and top to bottom then left to right
+    within each column. Blocks spanning several columns cut the page into
+    horizontal bands that are read one after the other, so a title is read
+    before the columns below it and a full-width figure caption between the
+    columns above and below it.
+
+    Returns:
+        the block indices in reading order and the matching column indices
+    """
+    labels = assign_columns(boxes, starts)
+    spanning = spanning_blocks(boxes, starts)
+    band_tops = np.sort(boxes[spanning, 1])
+    bands = np.searchsorted(band_tops, boxes[:, 1], side="right")
+    order = np.lexsort((boxes[:, 0], boxes[:, 1], labels, bands))
+    return order, labels[order]
+
+
+MATH_FONT_MARKERS = (
+    "cmmi",
+    "cmsy",
+    "cmex",
+    "msbm",
+    "msam",
+    "eufm",
+    "rsfs",
+    "math",
+    "symbol",
+    "stix",
+    "mt extra",
+)
+MATH_CODEPOINT_RANGES = (
+    (0x0370, 0x03FF),  # Greek
+    (0x2190, 0x21FF),  # Arrows
+    (0x2200, 0x22FF),  # Mathematical operators
+    (0x27C0, 0x27EF),  # Miscellaneous mathematical symbols
+    (0x2A00, 0x2AFF),  # Supplemental mathematical operators
+    (0x1D400, 0x1D7FF),  # Mathematical alphanumeric symbols
+)
+MATH_ASCII = set("=+<>^_|")
+
+
+def is_math_font(font_name: str) -> bool:
+    font_name = font_name.lower()
+    return any(marker in font_name for marker in MATH_FONT_MARKERS)
+
+
+def is_math_char(ch: str) -> bool:
+    if ch in MATH_ASCII:
+        return True
+    codepoint = ord(ch)
+    return any(low <= codepoint <= high for low, high in MATH_CODEPOINT_RANGES)
+
+
+def find_equation_regions(
+    page_dict: dict, min_density: float = 0.35, merge_gap: float = 4.0
+) -> List[Tuple[float, float, float, float]]:
+    """
+    Finds the regions of a page that likely contain mathematical expressions,
+    without running any model. A text line is considered math when the share of
+    its glyphs set in a math font (CMMI, CMSY, STIX, ...) or drawn from the math
+    Unicode blocks is at least `min_density`. Vertically adjacent math lines are
+    merged into a single region so that multi-line displays stay together.
+
+    Args:
+        page_dict: the output of `page.get_text("dict")`
+        min_density: the smallest share of math glyphs for a line to count as math
+        merge_gap: the largest vertical gap, in points, between lines of one region
+
+    Returns:
+        the list of (x0, y0, x1, y1) regions in page coordinates, top to bottom
+    """
+    math_lines = []
+    for block in page_dict.get("blocks", []):
+        if block.get("type", 0) != 0:
+            continue
+        for line in block.get("lines", []):
+            total = 0
+            math = 0
+            for span in line.get("spans", []):
+                glyphs = [ch for ch in span.get("text", "") if not ch.isspace()]
+                total += len(glyphs)
+                if is_math_font(span.get("font", "")):
+                    math += len(glyphs)
+                else:
+                    math += sum(1 for ch in glyphs if is_math_char(ch))
+            if total and math / total >= min_density:
+                math_lines.append(tuple(line["bbox"]))
+
+    math_lines.sort(key=lambda bbox: (bbox[1], bbox[0]))
+    regions = []
+    for x0, y0, x1, y1 in math_lines:
+        if regions:
+            rx0, ry0, rx1, ry1 = regions[-1]
+            if y0 - ry1 <= merge_gap and x0 <= rx1 and x1 >= rx0:
+                regions[-1] = (min(rx0, x0), ry0, max(rx1, x1), max(ry1, y1))
+                continue
+        regions.append((x0, y0, x1, y1))
+    return regions
+
+
+def count_rules(
+    drawings: Sequence[dict], max_thickness: float = 2.0, min_length: float = 30.0
+) -> Tuple[int, int]:
+    """
+    Counts the horizontal and vertical rules among a page's vector drawings, i.e.
+    straight lines and hairline rectangles such as table borders and booktabs rules.
+
+    Args:
+        drawings: the output of `page.get_drawings()`
+        max_thickness: the largest extent across a rule, in points
+        min_length: the smallest extent along a rule, in points
+
+    Returns:
+        the number of horizontal rules and the number of vertical rules
+    """
+    segments = []
+    for drawing in drawings:
+        for item in drawing.get("items", []):
+            if item[0] == "l":
+                p1, p2 = item[1], item[2]
+                segments.append((p1.x, p1.y, p2.x, p2.y))
+            elif item[0] == "re":
+                rect = item[1]
+                segments.append((rect.x0, rect.y0, rect.x1, rect.y1))
+    if not segments:
+        return 0, 0
+
+    segments = np.array(segments, dtype=np.float64)
+    widths = np.abs(segments[:, 2] - segments[:, 0])
+    heights = np.abs(segments[:, 3] - segments[:, 1])
+    horizontal = (heights <= max_thickness) & (widths >= min_length)
+    vertical = (widths <= max_thickness) & (heights >= min_length)
+    return int(horizontal.sum()), int(vertical.sum())
+
+
+def count_grid_rows(
+    word_boxes: np.ndarray,
+    min_cells: int = 3,
+    min_gap: float = 10.0,
+    tolerance: float = 2.0,
+) -> int:
+    """
+    Counts the text rows that split into at least `min_cells` cells, which is how
+    table rows show up in the word layout. Words are banded by their top edge, and
+    a new cell starts wherever the horizontal gap to the previous word in the same
+    band exceeds `min_gap`, well above normal word spacing.
+
+    Args:
+        word_boxes: the (n, 4) array of word bounding boxes from `page.get_text("words")`
+        min_cells: the smallest number of cells in a table row
+        min_gap: the smallest horizontal gap between two cells, in points
+        tolerance: the height of a band, in points
+
+    Returns:
+        int: the number of rows with at least `min_cells` cells
+    """
+    if len(word_boxes) == 0:
+        return 0
+    bands = np.round(word_boxes[:, 1] / tolerance).astype(np.int64)
+    order = np.lexsort((word_boxes[:, 0], bands))
+    bands = bands[order]
+    x0 = word_boxes[order, 0]
+    x1 = word_boxes[order, 2]
+
+    same_band = bands[1:] == bands[:-1]
+    new_cell = same_band & (x0[1:] - x1[:-1] > min_gap)
+    row_ids, row_index = np.unique(bands, return_inverse=True)
+    cells = np.ones(len(row_ids), dtype=np.int64)
+    np.add.at(cells, row_index[1:][new_cell], 1)
+    return int((cells >= min_cells).sum())
+
+
+def may_contain_table(
+    drawings: Sequence[dict],
+    word_boxes: np.ndarray,
+    image_boxes: Sequence[Tuple[float, float, float, float]],
+    page_area: float,
+    min_rules: int = 3,
+    min_grid_rows: int = 3,
+    min_image_fraction: float = 0.1,
+) -> bool:
+    """
+    Cheaply decides whether a page could contain a table, so that the neural
+    detector only runs on candidate pages. The test is deliberately permissive:
+    a page is a candidate when it has at least `min_rules` horizontal or vertical
+    rules, at least `min_grid_rows` rows of grid-aligned words, or a raster
+    image covering `min_image_fraction` of the page (a table may be scanned).
+
+    Args:
+        drawings: the output of `page.get_drawings()`
+        word_boxes: the (n, 4) array of word bounding boxes
+        image_boxes: the bounding boxes of the images on the page
+        page_area: the area of the page, in square points
+
+    Returns:
+        bool: False only when the page almost certainly has no table
+    """
+    horizontal, vertical = count_rules(drawings)
+    if horizontal >= min_rules or vertical >= min_rules:
+        return True
+    if count_grid_rows(word_boxes) >= min_grid_rows:
+        return True
+    image_area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in image_boxes)
+    return page_area > 0 and image_area / page_area >= min_image_fraction
+
+
+def merge_boxes(
+    boxes: Sequence[Tuple[float, float, float, float]], gap: float = 0.0
+) -> List[Tuple[float, float, float, float]]:
+    """
+    Merges boxes that overlap or lie within `gap` of each other into their union,
+    e.g. a scan embedded as several image strips.
+    """
+    merged = [tuple(box) for box in boxes]
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(i + 1, len(merged)):
+                a, b = merged[i], merged[j]
+                if (
+                    a[0] - gap <= b[2]
+                    and b[0] - gap <= a[2]
+                    and a[1] - gap <= b[3]
+                    and b[1] - gap <= a[3]
+                ):
+                    merged[i] = (
+                        min(a[0], b[0]),
+                        min(a[1], b[1]),
+                        max(a[2], b[2]),
+                        max(a[3], b[3]),
+                    )
+                    del merged[j]
+                    changed = True
+                    break
+            if changed:
+                break
+    return merged
+
+
+def find_ocr_regions(
+    image_boxes: Sequence[Tuple[float, float, float, float]],
+    text_boxes: np.ndarray,
+    text_lengths: np.ndarray,
+    page_rect: Tuple[float, float, float, float],
+    min_fraction: float = 0.05,
+    max_text_chars: int = 50,
+) -> List[Tuple[float, float, float, float]]:
+    """
+    Finds the raster image regions of a page that are worth OCR'ing: merged image
+    boxes, clipped to the page, that cover at least `min_fraction` of it and do
+    not already carry a text layer (as searchable scans do), i.e. that hold fewer
+    than `max_text_chars` characters of text blocks centred inside them.
+
+    Args:
+        image_boxes: the bounding boxes of the images on the page
+        text_boxes: the (n, 4) array of text block bounding boxes
+        text_lengths: the number of characters of every text block
+        page_rect: the page rectangle, in points
+
+    Returns:
+        List: the regions to OCR, in page points
+    """
+    px0, py0, px1, py1 = page_rect
+    page_area = (px1 - px0) * (py1 - py0)
+    clipped = [
+        (max(x0, px0), max(y0, py0), min(x1, px1), min(y1, py1))
+        for x0, y0, x1, y1 in image_boxes
+    ]
+    clipped = [box for box in clipped if box[2] > box[0] and box[3] > box[1]]
+
+    centres_x = (text_boxes[:, 0] + text_boxes[:, 2]) / 2
+    centres_y = (text_boxes[:, 1] + text_boxes[:, 3]) / 2
+    regions = []
+    for x0, y0, x1, y1 in merge_boxes(clipped):
+        if page_area <= 0 or (x1 - x0) * (y1 - y0) / page_area < min_fraction:
+            continue
+        inside = (
+            (centres_x >= x0) & (centres_x <= x1) & (centres_y >= y0) & (centres_y <= y1)
+        )
+        if text_lengths[inside].sum() < max_text_chars:
+            regions.append((x0, y0, x1, y1))
+    return regions
@@ -0,0 +1,272 @@
+import json
+import logging
+import os
+import re
+import shutil
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from llama_index.core.schema import NodeWithScore, TextNode
+
+logger = logging.getLogger(__name__)
+
+# Words, and numbers or identifiers with inner dots and hyphens such as 0.95 or ResNet-50
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    """
+    a about above after again all also am an and any are as at be because been before
+    being below between both but by can could did do does doing down during each few
+    for from further had has have having he her here hers him his how i if in into is
+    it its itself just me more most my no nor not of off on once only or other our out
+    over own same she should so some such than that the their them then there these
+    they this those through to too under until up very was we were what when where
+    which while who whom why will with would you your
+    """.split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercases and splits text into terms, dropping stopwords. Hyphenated terms
+    are kept whole and also split, so "ResNet-50" matches both itself and "ResNet".
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if "-" in token:
+            tokens.extend(part for part in token.split("-") if part not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """
+    An Okapi BM25 index over the chunks of a paper. The inverted index is stored in
+    compressed sparse row form: the postings (chunk, term frequency) of term `t`
+    are `doc_ids[indptr[t]:indptr[t + 1]]` and `term_freqs[...]`, so the whole
+    index is a handful of flat NumPy arrays plus the vocabulary.
+    """
+
+    def __init__(
+        self,
+        nodes: List[TextNode],
+        vocab: Dict[str, int],
+        indptr: np.ndarray,
+        doc_ids: np.ndarray,
+        term_freqs: np.ndarray,
+        doc_lengths: np.ndarray,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.nodes = nodes
+        self.vocab = vocab
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        n_docs = len(nodes)
+        doc_freqs = np.diff(indptr)
+        self.idf = np.log(1 + (n_docs - doc_freqs + 0.5) / (doc_freqs + 0.5))
+        self.avg_length = float(doc_lengths.mean()) if n_docs else 0.0
+
+    @classmethod
+    def from_nodes(cls, nodes: List[TextNode], **kwargs) -> "BM25Index":
+        vocab: Dict[str, int] = {}
+        postings = []
+        doc_lengths = []
+        for doc_id, node in enumerate(nodes):
+            tokens = tokenize(node.text)
+            doc_lengths.append(len(tokens))
+            for token, count in Counter(tokens).items():
+                term_id = vocab.setdefault(token, len(vocab))
+                postings.append((term_id, doc_id, count))
+
+        postings = np.array(postings, dtype=np.int32).reshape(-1, 3)
+        postings = postings[np.argsort(postings[:, 0], kind="stable")]
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(postings[:, 0], minlength=len(vocab)), out=indptr[1:])
+        return cls(
+            nodes,
+            vocab,
+            indptr,
+            postings[:, 1].copy(),
+            postings[:, 2].copy(),
+            np.array(doc_lengths, dtype=np.int32),
+            **kwargs,
+        )
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def score(self, query_text: str) -> np.ndarray:
+        """
+        Returns the BM25 score of every chunk for the query.
+        """
+        return self.score_batch([query_text])[0]
+
+    def score_batch(self, query_texts: List[str]) -> np.ndarray:
+        """
+        Returns the (m, n) BM25 scores of every chunk for each of the m queries.
+        The postings of a term are weighted once and added to every query that
+        contains it.
+        """
+        scores = np.zeros((len(query_texts), len(self.nodes)), dtype=np.float32)
+        queries_by_term: Dict[int, List[int]] = {}
+        for query_id, query_text in enumerate(query_texts):
+            for token in set(tokenize(query_text)):
+                term_id = self.vocab.get(token)
+                if term_id is not None:
+                    queries_by_term.setdefault(term_id, []).append(query_id)
+
+        for term_id, query_ids in queries_by_term.items():
+            start, stop = self.indptr[term_id], self.indptr[term_id + 1]
+            docs = self.doc_ids[start:stop]
+            tf = self.term_freqs[start:stop]
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / self.avg_length)
+            weights = self.idf[term_id] * tf * (self.k1 + 1) / (tf + norm)
+            # Postings hold each chunk once per term, so fancy indexing adds safely
+            scores[np.ix_(query_ids, docs)] += weights
+        return scores
+
+    def save(self, path: str) -> None:
+        """
+        Writes the index to the directory `path`, renamed into place once complete.
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(tmp_path, exist_ok=True)
+        np.savez(
+            os.path.join(tmp_path, "postings.npz"),
+            indptr=self.indptr,
+            doc_ids=self.doc_ids,
+            term_freqs=self.term_freqs,
+            doc_lengths=self.doc_lengths,
+        )
+        with open(os.path.join(tmp_path, "index.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "k1": self.k1,
+                    "b": self.b,
+                    "vocab": self.vocab,
+                    "nodes": [
+                        {"id": node.node_id, "text": node.text, "metadata": node.metadata}
+                        for node in self.nodes
+                    ],
+                },
+                f,
+            )
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(os.path.join(path, "index.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        with np.load(os.path.join(path, "postings.npz")) as postings:
+            arrays = {name: postings[name] for name in postings.files}
+        nodes = [
+            TextNode(id_=node["id"], text=node["text"], metadata=node["metadata"])
+            for node in meta["nodes"]
+        ]
+        return cls(
+            nodes,
+            meta["vocab"],
+            arrays["indptr"],
+            arrays["doc_ids"],
+            arrays["term_freqs"],
+            arrays["doc_lengths"],
+            k1=meta["k1"],
+            b=meta["b"],
+        )
+
+
+class HybridRetriever:
+    """
+    Fuses dense and BM25 retrieval. Each side proposes `candidate_k` chunks; every
+    candidate then gets the fused score
+
+        alpha * cosine similarity + (1 - alpha) * BM25 / max BM25
+
+    where chunks are matched across both sides by their text, and candidates the
+    dense side did not return get a similarity of 0, so they only rank by their
+    BM25 share and cannot outscore dense matches on lexical ties. Exact terms such
+    as dataset names, metrics and numbers thus reach the top even when the
+    embedding misses them, so fewer chunks need to be sent as context.
+    """
+
+    def __init__(
+        self,
+        dense_retriever: Any,
+        lexical: BM25Index,
+        similarity_top_k: int = 5,
+        alpha: float = 0.5,
+        candidate_k: Optional[int] = None,
+    ):
+        self.dense_retriever = dense_retriever
+        self.lexical = lexical
+        self.similarity_top_k = similarity_top_k
+        self.alpha = alpha
+        self.candidate_k = candidate_k or 4 * similarity_top_k
+        self._by_text = {node.text: i for i, node in enumerate(lexical.nodes)}
+
+    def retrieve(self, query) -> List[NodeWithScore]:
+        """
+        Args:
+            query: the query text, or a QueryBundle carrying its embedding
+        """
+        query_text = getattr(query, "query_str", query)
+        return self._fuse(
+            self.dense_retriever.retrieve(query), self.lexical.score(query_text)
+        )
+
+    def retrieve_batch(
+        self, query_vectors, query_texts: List[str]
+    ) -> List[List[NodeWithScore]]:
+        """
+        Retrieves several embedded queries at once: the dense side in one call of
+        its own `retrieve_batch` and the BM25 side in one pass over the postings.
+
+        Args:
+            query_vectors: the embeddings of the queries
+            query_texts: the texts of the same queries, for BM25
+        """
+        dense_batch = self.dense_retriever.retrieve_batch(query_vectors, query_texts)
+        lexical_batch = self.lexical.score_batch(query_texts)
+        return [
+            self._fuse(dense, lexical_scores)
+            for dense, lexical_scores in zip(dense_batch, lexical_batch)
+        ]
+
+    def _fuse(
+        self, dense: List[NodeWithScore], lexical_scores: np.ndarray
+    ) -> List[NodeWithScore]:
+        top_lexical = float(lexical_scores.max()) if len(lexical_scores) else 0.0
+        if top_lexical > 0:
+            lexical_scores = lexical_scores / top_lexical
+
+        candidates = {}
+        for result in dense:
+            lexical_id = self._by_text.get(result.node.text)
+            lexical_score = lexical_scores[lexical_id] if lexical_id is not None else 0.0
+            candidates[result.node.text] = (result.node, result.score or 0.0, lexical_score)
+
+        count = min(self.candidate_k, len(lexical_scores))
+        if top_lexical > 0 and count:
+            for lexical_id in np.argpartition(-lexical_scores, count - 1)[:count]:
+                node = self.lexical.nodes[lexical_id]
+                if node.text not in candidates and lexical_scores[lexical_id] > 0:
+                    candidates[node.text] = (node, 0.0, lexical_scores[lexical_id])
+
+        fused = [
+            NodeWithScore(
+                node=node,
+                score=float(self.alpha * dense_score + (1 - self.alpha) * lexical_score),
+            )
+            for node, dense_score, lexical_score in candidates.values()
+        ]
+        fused.sort(key=lambda result: result.score, reverse=True)
+        return fused[: self.similarity_top_k]
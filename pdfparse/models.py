@@ -0,0 +1,277 @@
+import os
+import sys
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import torch
+from transformers import TableTransformerForObjectDetection, DetrImageProcessor
+from transformers.models.table_transformer.modeling_table_transformer import (
+    TableTransformerObjectDetectionOutput,
+)
+
+logger = logging.getLogger(__name__)
+
+TABLE_MODEL_NAME = "microsoft/table-transformer-detection"
+EMBED_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+ONNX_CACHE_DIR = os.getenv(
+    "PRAGATI_ONNX_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "pragati", "onnx"),
+)
+
+# Registry key of the table detector for every inference backend
+TABLE_BACKENDS = {
+    "torch": "table_model",
+    "int8": "table_model_int8",
+    "onnx": "table_model_onnx",
+}
+
+
+def resident_bytes(obj: Any) -> int:
+    """
+    Estimates the memory held by a model's parameters and buffers.
+
+    Args:
+        obj: a torch module, or any object holding torch modules as attributes
+             (e.g. a pix2tex LatexOCR instance).
+
+    Returns:
+        int: the number of bytes held by the tensors of the model(s).
+    """
+    if isinstance(obj, torch.nn.Module):
+        tensors = list(obj.parameters()) + list(obj.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    if hasattr(obj, "__dict__"):
+        return sum(
+            resident_bytes(value)
+            for value in vars(obj).values()
+            if isinstance(value, torch.nn.Module)
+        )
+    return 0
+
+
+class ModelRegistry:
+    """
+    A thread-safe, process-wide registry of lazily loaded models.
+    Each model is loaded once, on first use, and shared by every caller.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._models: Dict[str, Any] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any]) -> None:
+        """
+        Registers a loader for a model without loading it.
+
+        Args:
+            name: the key under which the model is shared
+            loader: a zero-argument callable returning the loaded model
+        """
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+            self._models.pop(name, None)
+            self._stats.pop(name, None)
+
+    def __getstate__(self):
+        # Only the loaders are sent to other processes, which load their own models
+        with self._lock:
+            return {"loaders": dict(self._loaders)}
+
+    def __setstate__(self, state):
+        self.__init__()
+        for name, loader in state["loaders"].items():
+            self.register(name, loader)
+
+    def get(self, name: str) -> Any:
+        """
+        Returns the model registered under `name`, loading it on first use.
+        Concurrent first calls block until a single load has completed.
+        """
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if name not in self._loaders:
+                raise KeyError(f"No model registered under '{name}'")
+            model_lock = self._locks[name]
+
+        with model_lock:
+            model = self._models.get(name)
+            if model is None:
+                start_time = time.time()
+                model = self._loaders[name]()
+                load_time = time.time() - start_time
+                self._stats[name] = {
+                    "load_seconds": load_time,
+                    "resident_bytes": resident_bytes(model),
+                }
+                self._models[name] = model
+                logger.info(
+                    f"Loaded model '{name}' in {load_time:.2f} seconds "
+                    f"({self._stats[name]['resident_bytes'] / 2**20:.1f} MiB)"
+                )
+        return model
+
+    def warm(self, names: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Loads the given models (all registered models by default) ahead of time,
+        e.g. at service start.
+
+        Returns:
+            Dict: the per-model statistics, see `stats`.
+        """
+        for name in list(names) if names is not None else list(self._loaders):
+            self.get(name)
+        return self.stats()
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns the load time (seconds) and resident size (bytes) of every
+        model loaded so far, keyed by model name.
+        """
+        return {name: dict(stat) for name, stat in self._stats.items()}
+
+    def unload(self, name: str) -> None:
+        with self._locks.get(name, self._lock):
+            self._models.pop(name, None)
+            self._stats.pop(name, None)
+
+
+def _load_table_processor() -> DetrImageProcessor:
+    return DetrImageProcessor()
+
+
+def _load_table_model() -> TableTransformerForObjectDetection:
+    model = TableTransformerForObjectDetection.from_pretrained(TABLE_MODEL_NAME)
+    model.eval()
+    return model
+
+
+def _load_table_model_int8() -> torch.nn.Module:
+    """
+    Applies dynamic int8 quantization to the linear layers of the table transformer,
+    which hold most of its weights and FLOPs on CPU.
+    """
+    model = TableTransformerForObjectDetection.from_pretrained(TABLE_MODEL_NAME)
+    model.eval()
+    return torch.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+class OnnxTableModel:
+    """
+    Runs the table transformer exported to ONNX with onnxruntime. It is called like
+    the PyTorch model and returns the same output type, so the image processor's
+    post-processing works unchanged.
+    """
+
+    def __init__(self, onnx_path: str, intra_op_threads: int = None):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads or (os.cpu_count() or 1)
+        options.graph_optimization_level = (
+            onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        self.onnx_path = onnx_path
+        self.session = onnxruntime.InferenceSession(
+            onnx_path, options, providers=["CPUExecutionProvider"]
+        )
+
+    @staticmethod
+    def export(onnx_path: str) -> str:
+        """
+        Exports the PyTorch table transformer to `onnx_path`, with dynamic batch
+        and image dimensions.
+        """
+        model = TableTransformerForObjectDetection.from_pretrained(TABLE_MODEL_NAME)
+        model.eval()
+        model.config.return_dict = False
+        pixel_values = torch.zeros(1, 3, 800, 800)
+        pixel_mask = torch.ones(1, 800, 800, dtype=torch.long)
+        os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+        tmp_path = f"{onnx_path}.{os.getpid()}.tmp"
+        torch.onnx.export(
+            model,
+            (pixel_values, pixel_mask),
+            tmp_path,
+            input_names=["pixel_values", "pixel_mask"],
+            output_names=["logits", "pred_boxes"],
+            dynamic_axes={
+                "pixel_values": {0: "batch", 2: "height", 3: "width"},
+                "pixel_mask": {0: "batch", 1: "height", 2: "width"},
+                "logits": {0: "batch"},
+                "pred_boxes": {0: "batch"},
+            },
+            opset_version=17,
+        )
+        os.replace(tmp_path, onnx_path)
+        logger.info(f"Exported table transformer to {onnx_path}")
+        return onnx_path
+
+    def __call__(self, pixel_values, pixel_mask=None, **kwargs):
+        if pixel_mask is None:
+            pixel_mask = torch.ones(
+                pixel_values.shape[0], *pixel_values.shape[2:], dtype=torch.long
+            )
+        logits, pred_boxes = self.session.run(
+            ["logits", "pred_boxes"],
+            {
+                "pixel_values": pixel_values.numpy().astype("float32"),
+                "pixel_mask": pixel_mask.numpy().astype("int64"),
+            },
+        )
+        return TableTransformerObjectDetectionOutput(
+            logits=torch.from_numpy(logits), pred_boxes=torch.from_numpy(pred_boxes)
+        )
+
+
+def _load_table_model_onnx() -> OnnxTableModel:
+    onnx_path = os.path.join(ONNX_CACHE_DIR, "table-transformer-detection.onnx")
+    if not os.path.exists(onnx_path):
+        OnnxTableModel.export(onnx_path)
+    # Follows the torch thread budget, which page workers split between them
+    return OnnxTableModel(onnx_path, intra_op_threads=torch.get_num_threads())
+
+
+def _load_latex_ocr():
+    sys.path.insert(0, "old_pkgs/timm0.5.4")
+    try:
+        from pix2tex.cli import LatexOCR
+    finally:
+        sys.path.pop(0)
+    return LatexOCR()
+
+
+def _load_embed_model():
+    """
+    Loads the chunk embedding model behind a persistent cache of its embeddings,
+    so that chunks seen in earlier index builds are never embedded again.
+    """
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from pdfparse.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+    return CachedEmbeddings(
+        HuggingFaceEmbeddings(model_name=EMBED_MODEL_NAME),
+        EmbeddingCache(EMBED_MODEL_NAME),
+    )
+
+
+registry = ModelRegistry()
+registry.register("table_processor", _load_table_processor)
+registry.register("table_model", _load_table_model)
+registry.register("table_model_int8", _load_table_model_int8)
+registry.register("table_model_onnx", _load_table_model_onnx)
+registry.register("latex_ocr", _load_latex_ocr)
+registry.register("embed_model", _load_embed_model)
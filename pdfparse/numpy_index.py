@@ -0,0 +1,276 @@
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from llama_index.core.schema import MetadataMode, NodeWithScore, TextNode
+
+from pdfparse.indexes import (
+    DEFAULT_MAX_BYTES,
+    DEFAULT_MIN_AGE,
+    DEFAULT_TTL,
+    IndexManager,
+    directory_size,
+)
+
+logger = logging.getLogger(__name__)
+
+NUMPY_INDEX_DIR = os.getenv(
+    "PRAGATI_NUMPY_INDEX",
+    os.path.join(os.path.expanduser("~"), ".cache", "pragati", "numpy_index"),
+)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Returns the rows of `vectors` scaled to unit length, as a contiguous float32
+    matrix, so that cosine similarity is a plain dot product.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class NumpyIndex:
+    """
+    An exact, in-memory vector index for a single paper. The node embeddings are
+    kept normalized in one contiguous float32 matrix, and a search is one matrix
+    product followed by a partial sort, which for a few hundred chunks is far
+    cheaper than a round trip through a vector database.
+
+    `embeddings` must already be normalized, see `normalize`; `from_nodes` and
+    `load` take care of it.
+    """
+
+    def __init__(self, embeddings: np.ndarray, nodes: List[TextNode], embed_model: Any):
+        if len(embeddings) != len(nodes):
+            raise ValueError(f"{len(embeddings)} embeddings for {len(nodes)} nodes")
+        self.embeddings = embeddings
+        self.nodes = nodes
+        self.embed_model = embed_model
+
+    @classmethod
+    def from_nodes(cls, nodes: List[TextNode], embed_model: Any) -> "NumpyIndex":
+        """
+        Embeds the nodes with a LangChain embedding model, using the same text
+        (content plus embeddable metadata) as a VectorStoreIndex would. A document
+        without any chunk gets an empty index of the model's dimension.
+        """
+        texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+        if not texts:
+            dim = len(embed_model.embed_query(""))
+            return cls(np.empty((0, dim), dtype=np.float32), nodes, embed_model)
+        embeddings = normalize(embed_model.embed_documents(texts))
+        return cls(embeddings, nodes, embed_model)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def search(
+        self, query_vectors: np.ndarray, top_k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the `top_k` nodes most similar to each query.
+
+        Args:
+            query_vectors: the (m, d) query embeddings, normalized or not
+            top_k: the number of nodes to return per query
+
+        Returns:
+            the (m, k) node indices and cosine similarities, best match first
+        """
+        queries = normalize(np.atleast_2d(query_vectors))
+        top_k = min(top_k, len(self.nodes))
+        if top_k == 0:
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+
+        scores = queries @ self.embeddings.T
+        if top_k < scores.shape[1]:
+            candidates = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        else:
+            candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        return (
+            np.take_along_axis(candidates, order, axis=1),
+            np.take_along_axis(candidate_scores, order, axis=1),
+        )
+
+    def as_retriever(self, similarity_top_k: int = 5) -> "NumpyRetriever":
+        return NumpyRetriever(self, similarity_top_k)
+
+    def save(self, path: str) -> None:
+        """
+        Writes the index to the directory `path`: the embeddings as an .npy file
+        and the nodes as JSON. The directory is renamed into place once complete.
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(tmp_path, exist_ok=True)
+        np.save(os.path.join(tmp_path, "embeddings.npy"), self.embeddings)
+        with open(os.path.join(tmp_path, "nodes.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                [
+                    {"id": node.node_id, "text": node.text, "metadata": node.metadata}
+                    for node in self.nodes
+                ],
+                f,
+            )
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, embed_model: Any, mmap: bool = True) -> "NumpyIndex":
+        """
+        Loads an index saved with `save`. With `mmap`, the embeddings are mapped
+        read-only from disk instead of read into memory.
+        """
+        embeddings = np.load(
+            os.path.join(path, "embeddings.npy"), mmap_mode="r" if mmap else None
+        )
+        with open(os.path.join(path, "nodes.json"), encoding="utf-8") as f:
+            nodes = [
+                TextNode(id_=node["id"], text=node["text"], metadata=node["metadata"])
+                for node in json.load(f)
+            ]
+        return cls(embeddings, nodes, embed_model)
+
+
+class NumpyRetriever:
+    """
+    Retrieves from a NumpyIndex with the same interface as a llama_index retriever.
+    """
+
+    def __init__(self, index: NumpyIndex, similarity_top_k: int = 5):
+        self.index = index
+        self.similarity_top_k = similarity_top_k
+
+    def retrieve(self, query) -> List[NodeWithScore]:
+        """
+        Args:
+            query: the query text, or a QueryBundle carrying its embedding
+        """
+        embedding = getattr(query, "embedding", None)
+        if embedding is None:
+            embedding = self.index.embed_model.embed_query(getattr(query, "query_str", query))
+        return self.retrieve_batch(np.array(embedding)[None, :])[0]
+
+    def retrieve_batch(
+        self, query_vectors, query_texts: List[str] = None
+    ) -> List[List[NodeWithScore]]:
+        """
+        Retrieves the nodes of several embedded queries with one matrix product.
+        The query texts are not needed and only accepted for interface parity with
+        the other retrievers.
+        """
+        indices, scores = self.index.search(
+            np.array(query_vectors, dtype=np.float32), self.similarity_top_k
+        )
+        return [
+            [
+                NodeWithScore(node=self.index.nodes[idx], score=float(score))
+                for idx, score in zip(row_indices, row_scores)
+            ]
+            for row_indices, row_scores in zip(indices, scores)
+        ]
+
+
+class NumpyIndexManager(IndexManager):
+    """
+    An IndexManager for NumpyIndex. Indexes are saved under `path` in a directory
+    named after their key and memory-mapped when reopened; directories unused for
+    longer than the TTL, then the least recently used ones beyond the size cap,
+    are deleted after every build, except those used within the last `min_age`
+    seconds.
+    """
+
+    def __init__(
+        self,
+        path: str = NUMPY_INDEX_DIR,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        min_age: float = DEFAULT_MIN_AGE,
+        mmap: bool = True,
+    ):
+        super().__init__(path, ttl, max_bytes, min_age)
+        self.mmap = mmap
+
+    def _index_path(self, key: str) -> str:
+        return os.path.join(self.path, self.collection_name(key))
+
+    def lexical_path(self, key: str) -> str:
+        return os.path.join(self._index_path(key), "bm25")
+
+    def retriever(self, index: NumpyIndex, similarity_top_k: int = 5) -> NumpyRetriever:
+        return index.as_retriever(similarity_top_k=similarity_top_k)
+
+    def _open(self, key: str, embed_model: Any):
+        index_path = self._index_path(key)
+        if not os.path.isdir(index_path):
+            return None
+        index = NumpyIndex.load(index_path, embed_model, self.mmap)
+        os.utime(index_path)
+        self.reopens += 1
+        logger.info(f"Reopened index {index_path} with {len(index)} vectors")
+        return index
+
+    def _build(self, key: str, build_nodes, embed_model: Any) -> NumpyIndex:
+        nodes = build_nodes()
+        index = NumpyIndex.from_nodes(nodes, embed_model)
+        os.makedirs(self.path, exist_ok=True)
+        index.save(self._index_path(key))
+        self.builds += 1
+        logger.info(f"Built index {self._index_path(key)} with {len(nodes)} nodes")
+        return index
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._indexes.pop(key, None)
+            self._lexical.pop(key, None)
+        shutil.rmtree(self._index_path(key), ignore_errors=True)
+
+    def collect_garbage(
+        self, ttl: float = None, max_bytes: int = None, min_age: float = None
+    ) -> Dict:
+        ttl = self.ttl if ttl is None else ttl
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        min_age = self.min_age if min_age is None else min_age
+        in_use = {self.collection_name(key) for key in self._indexes}
+        entries = []
+        if os.path.isdir(self.path):
+            for name in os.listdir(self.path):
+                index_path = os.path.join(self.path, name)
+                if name in in_use or not os.path.isdir(index_path):
+                    continue
+                entries.append(
+                    (os.path.getmtime(index_path), index_path, directory_size(index_path))
+                )
+        entries.sort()
+
+        size = directory_size(self.path)
+        now = time.time()
+        deleted = []
+        reclaimed = 0
+        for last_used, index_path, entry_size in entries:
+            if now - last_used <= ttl and size <= max_bytes:
+                break
+            if now - last_used <= min_age:
+                break
+            shutil.rmtree(index_path, ignore_errors=True)
+            size -= entry_size
+            reclaimed += entry_size
+            deleted.append(os.path.basename(index_path))
+
+        if deleted:
+            logger.info(
+                f"Deleted {len(deleted)} indexes, reclaimed {reclaimed / 2**20:.1f} MiB "
+                f"({size / 2**20:.1f} MiB left)"
+            )
+        return {"deleted": deleted, "reclaimed_bytes": reclaimed, "size_bytes": size}
+
+
+default_numpy_manager = NumpyIndexManager()
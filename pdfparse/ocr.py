@@ -0,0 +1,192 @@
+import importlib.util
+import logging
+import multiprocessing
+import os
+import shlex
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+
+import pytesseract
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# The resident tesseract APIs of this process, by language and config; None
+# when tesserocr is not installed
+_engines = None
+
+
+def _parse_config(config: str) -> Dict:
+    """
+    Translates a pytesseract config string into PyTessBaseAPI arguments. Only
+    --psm, --oem, --dpi and -c name=value are understood.
+
+    Raises:
+        ValueError: if the config has any other option
+    """
+    tokens = shlex.split(config or "")
+    options = {"variables": {}}
+    for flag, value in zip(tokens[::2], tokens[1::2]):
+        if flag == "--psm":
+            options["psm"] = int(value)
+        elif flag == "--oem":
+            options["oem"] = int(value)
+        elif flag == "--dpi":
+            options["variables"]["user_defined_dpi"] = value
+        elif flag == "-c" and "=" in value:
+            name, _, variable = value.partition("=")
+            options["variables"][name] = variable
+        else:
+            raise ValueError(f"Unsupported tesseract option {flag} {value}")
+    if len(tokens) % 2:
+        raise ValueError(f"Unsupported tesseract option {tokens[-1]}")
+    return options
+
+
+def _get_engine(lang: str, config: str):
+    """
+    Returns the resident tesseract API of `lang` and `config`, loading it on first
+    use, or None if tesserocr is not installed or cannot apply the config.
+    """
+    if _engines is None:
+        return None
+    key = (lang, config or "")
+    if key not in _engines:
+        import tesserocr
+
+        try:
+            options = _parse_config(config)
+        except ValueError as e:
+            logger.warning(f"Using pytesseract for config '{config}': {str(e)}")
+            _engines[key] = None
+            return None
+        _engines[key] = tesserocr.PyTessBaseAPI(lang=lang, **options)
+        logger.info(f"OCR worker {os.getpid()} loaded tesseract '{lang}' data")
+    return _engines[key]
+
+
+def _init_ocr_worker(lang: str, config: str = "") -> None:
+    """
+    Loads the OCR engine once per worker process. With tesserocr installed, the
+    tesseract API of every language and config used stays resident with its
+    traineddata loaded; otherwise the worker falls back to pytesseract.
+    """
+    global _engines
+    if importlib.util.find_spec("tesserocr") is None:
+        _engines = None
+        logger.warning(
+            f"OCR worker {os.getpid()} using pytesseract (tesserocr not installed)"
+        )
+        return
+    _engines = {}
+    _get_engine(lang, config)
+
+
+def _ocr_in_worker(mode: str, size, data: bytes, lang: str, config: str) -> str:
+    image = Image.frombytes(mode, size, data)
+    engine = _get_engine(lang, config)
+    if engine is None:
+        return pytesseract.image_to_string(image, lang=lang, config=config)
+    engine.SetImage(image)
+    return engine.GetUTF8Text()
+
+
+class OCRService:
+    """
+    A pool of long-lived OCR worker processes. Each worker loads the tesseract
+    language data once and then serves images sent to it over a pipe as raw
+    pixel buffers, so no process is forked and no traineddata is reloaded per call.
+
+    It exposes `image_to_string` like pytesseract, so it can be passed as the
+    `ocr_engine` of PDFParser or ResearchPaperParser, and it is safe to call from
+    several threads at once.
+    """
+
+    def __init__(self, workers: int = None, lang: str = "eng", config: str = ""):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.lang = lang
+        self.config = config
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_process = False
+
+    def start(self) -> "OCRService":
+        """
+        Starts the worker processes, e.g. at service start. Called lazily otherwise.
+        """
+        with self._lock:
+            if self._executor is None:
+                if importlib.util.find_spec("tesserocr") is None:
+                    logger.warning(
+                        "tesserocr is not installed: OCR workers fall back to "
+                        "pytesseract, which starts a tesseract process and reloads "
+                        "its language data on every call"
+                    )
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_ocr_worker,
+                    initargs=(self.lang, self.config),
+                )
+                logger.info(f"Started OCR service with {self.workers} workers")
+        return self
+
+    def image_to_string(
+        self, image: Image.Image, lang: str = None, config: str = None
+    ) -> str:
+        """
+        OCRs an image in one of the resident workers.
+
+        Args:
+            image (Image.Image): The image to read.
+            lang (str, optional): Overrides the service language.
+            config (str, optional): Overrides the service's extra tesseract options.
+                With tesserocr, --psm, --oem, --dpi and -c name=value are applied
+                to a resident API per language and config; other options make the
+                call fall back to pytesseract.
+
+        Returns:
+            str: The recognised text.
+        """
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        args = (
+            image.mode,
+            image.size,
+            image.tobytes(),
+            lang or self.lang,
+            self.config if config is None else config,
+        )
+
+        if self._in_process:
+            with self._lock:
+                if not self._engine_loaded:
+                    _init_ocr_worker(self.lang, self.config)
+                    self._engine_loaded = True
+                return _ocr_in_worker(*args)
+
+        executor = self._executor or self.start()._executor
+        return executor.submit(_ocr_in_worker, *args).result()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def __enter__(self) -> "OCRService":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __getstate__(self):
+        return {"workers": self.workers, "lang": self.lang, "config": self.config}
+
+    def __setstate__(self, state):
+        # A service sent to a pool worker (e.g. by PDFParser's parallel mode) keeps
+        # one resident engine in that process instead of nesting another pool
+        self.__init__(**state)
+        self._in_process = True
+        self._engine_loaded = False
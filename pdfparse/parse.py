@@ -1,31 +1,111 @@
 import fitz  # PyMuPDF
 from PIL import Image
 import numpy as np
-from transformers import TableTransformerForObjectDetection, DetrImageProcessor
 import torch
 import os
-import sys
 import pandas as pd
-from typing import List, Dict, Tuple
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Union
 import logging
 from pathlib import Path
 import zipfile
+import math
+import multiprocessing
+import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import pytesseract
-
-sys.path.insert(0, "old_pkgs/timm0.5.4")
-from pix2tex.cli import LatexOCR
-
-sys.path.pop(0)
+from pdfparse.layout import (
+    blocks_to_array,
+    column_bounds,
+    find_column_starts,
+    find_equation_regions,
+    may_contain_table,
+    order_blocks,
+)
+from pdfparse.cache import ParseCache
+from pdfparse.raster import PageRaster, RasterCache
+from pdfparse.models import (
+    TABLE_BACKENDS,
+    ModelRegistry,
+    registry as default_registry,
+)
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
+PARSER_VERSION = "2"
+
+
+def _empty_results() -> Dict:
+    return {
+        "text": {},
+        "tables": {},
+        "equations": {},
+        "images": {},
+        "embedded_images": {},
+    }
+
+
+def _collect_pages(pages: Iterable[Dict]) -> Dict:
+    results = _empty_results()
+    for page_result in pages:
+        page_num = page_result["page"]
+        results["text"][page_num] = page_result["text"]
+        results["tables"][page_num] = page_result["tables"]
+        results["equations"][page_num] = page_result["equations"]
+        if page_result["image"] is not None:
+            results["images"][page_num] = page_result["image"]
+        if page_result["embedded_images"] is not None:
+            results["embedded_images"][page_num] = page_result["embedded_images"]
+    return results
+
+
+def _page_files(pages: Iterable[Dict]) -> Iterator[str]:
+    for page_result in pages:
+        for table in page_result["tables"]:
+            if table["image_path"]:
+                yield table["image_path"]
+        if page_result["image"]:
+            yield page_result["image"]
+        yield from page_result["embedded_images"] or []
+
+
+def _iter_collected_pages(results: Dict) -> Iterator[Dict]:
+    for page_num, text in results["text"].items():
+        yield {
+            "page": page_num,
+            "text": text,
+            "tables": results["tables"].get(page_num, []),
+            "equations": results["equations"].get(page_num, []),
+            "image": results["images"].get(page_num),
+            "embedded_images": results["embedded_images"].get(page_num),
+        }
+
 
 class ResearchPaperParser:
-    def __init__(self, df, output_dir: str, save: bool = False):
+    def __init__(
+        self,
+        df,
+        output_dir: str,
+        save: bool = False,
+        registry: ModelRegistry = None,
+        table_batch_size: int = 4,
+        ocr_workers: int = None,
+        raster_cache_size: int = 8,
+        cache: ParseCache = None,
+        table_backend: str = "torch",
+        detection_zoom: float = 1.0,
+        crop_zoom: float = 2.0,
+        table_prefilter: bool = True,
+        ocr_engine=pytesseract,
+    ):
         self.save = save
+        self.table_batch_size = max(1, table_batch_size)
+        self.ocr_workers = ocr_workers or min(8, os.cpu_count() or 1)
+        # Anything with pytesseract's image_to_string, e.g. pdfparse.ocr.OCRService
+        self.ocr_engine = ocr_engine
         if isinstance(df, str):
             self.pdf_path = df
         elif isinstance(df, pd.DataFrame):
@@ -39,19 +119,43 @@ class ResearchPaperParser:
 
         self.output_dir = output_dir
         self.document = None
-
-        self.table_processor = DetrImageProcessor()
-        self.table_model = TableTransformerForObjectDetection.from_pretrained(
-            "microsoft/table-transformer-detection"
-        )
-
-        self.latex_ocr = LatexOCR()
+        self.raster_cache = RasterCache(raster_cache_size)
+        self.cache = cache
+        if table_backend not in TABLE_BACKENDS:
+            raise ValueError(
+                f"table_backend must be one of {sorted(TABLE_BACKENDS)}, got '{table_backend}'"
+            )
+        self.table_backend = table_backend
+        # Pages are rendered cheaply for detection, and only the detected regions
+        # are re-rendered at the higher zoom that OCR needs. Pages that are saved
+        # anyway are rendered once at crop_zoom instead. Reported table and equation
+        # boxes are always in crop_zoom pixels
+        self.detection_zoom = detection_zoom
+        self.crop_zoom = crop_zoom
+        self.table_prefilter = table_prefilter
+        self.prefilter_stats = {"pages_checked": 0, "pages_skipped": 0}
+
+        # Models are shared across parser instances and only loaded on first use
+        self.registry = registry if registry is not None else default_registry
         if self.save:
             Path(self.output_dir).mkdir(parents=True, exist_ok=True)
 
+    @property
+    def table_processor(self):
+        return self.registry.get("table_processor")
+
+    @property
+    def table_model(self):
+        return self.registry.get(TABLE_BACKENDS[self.table_backend])
+
+    @property
+    def latex_ocr(self):
+        return self.registry.get("latex_ocr")
+
     def load_pdf(self) -> None:
         try:
             self.document = fitz.open(self.pdf_path)
+            self.raster_cache.clear()
             logger.info(
                 f"Loaded PDF with {len(self.document)} pages from {self.pdf_path}"
             )
@@ -74,46 +178,8 @@ class ResearchPaperParser:
 
         try:
             page = self.document[page_num]
-            blocks = page.get_text("blocks")
-
-            text_blocks = [block for block in blocks if block[4].strip()]
-            if not text_blocks:
-                return [(0, page.rect.width)]
-
-            x_coords = sorted([block[0] for block in text_blocks])
-            x_max_coords = sorted([block[2] for block in text_blocks])
-
-            gaps = [x_coords[i + 1] - x_max_coords[i] for i in range(len(x_coords) - 1)]
-            significant_gaps = [x for x in gaps if x > 50]
-
-            if len(significant_gaps) == 0:
-                columns = [(0, page.rect.width)]
-            elif len(significant_gaps) == 1:
-                columns = [
-                    (
-                        0,
-                        x_max_coords[x_coords.index(x_coords[0] + significant_gaps[0])],
-                    ),
-                    (
-                        x_coords[x_coords.index(x_coords[0] + significant_gaps[0]) + 1],
-                        page.rect.width,
-                    ),
-                ]
-            else:
-                columns = [
-                    (
-                        0,
-                        x_max_coords[x_coords.index(x_coords[0] + significant_gaps[0])],
-                    ),
-                    (
-                        x_coords[x_coords.index(x_coords[0] + significant_gaps[0]) + 1],
-                        x_max_coords[x_coords.index(x_coords[0] + significant_gaps[1])],
-                    ),
-                    (
-                        x_coords[x_coords.index(x_coords[0] + significant_gaps[1]) + 1],
-                        page.rect.width,
-                    ),
-                ]
+            boxes, _ = blocks_to_array(page.get_text("blocks"))
+            columns = column_bounds(boxes, page.rect.width)
 
             logger.info(f"Detected {len(columns)} columns on page {page_num}")
             return columns
@@ -124,6 +190,7 @@ class ResearchPaperParser:
     def extract_text(self, page_num: int) -> str:
         """
         Extracts text from a specific page of the loaded PDF document, considering column-based text layout.
+        The text blocks are read once, split into any number of columns and ordered in a single pass.
 
         Args:
             page_num (int): The index of the page from which to extract text.
@@ -137,19 +204,25 @@ class ResearchPaperParser:
 
         try:
             page = self.document[page_num]
-            columns = self.detect_columns(page_num)
-            full_text = ""
-
-            for col_left, col_right in columns:
-                clip_rect = fitz.Rect(col_left, 0, col_right, page.rect.height)
-                blocks = page.get_text("blocks", clip=clip_rect)
-                blocks.sort(key=lambda b: (b[1], b[0]))
-                column_text = "\n".join(
-                    block[4].strip() for block in blocks if block[4].strip()
-                )
-                full_text += column_text + "\n\n"
-
-            return full_text.strip()
+            boxes, texts = blocks_to_array(page.get_text("blocks"))
+            if not texts:
+                return ""
+
+            starts = find_column_starts(boxes)
+            order, labels = order_blocks(boxes, starts)
+            logger.info(f"Detected {len(starts)} columns on page {page_num}")
+
+            # Consecutive blocks of one column form a paragraph group; a column
+            # can appear more than once when spanning blocks split the page
+            columns = []
+            previous_label = None
+            for idx, label in zip(order, labels):
+                if label != previous_label:
+                    columns.append([])
+                    previous_label = label
+                columns[-1].append(texts[idx])
+
+            return "\n\n".join("\n".join(column_texts) for column_texts in columns)
         except Exception as e:
             logger.error(f"Error extracting text from page {page_num}: {str(e)}")
             return ""
@@ -171,72 +244,344 @@ class ResearchPaperParser:
 
         try:
             page = self.document[page_num]
-            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            return img
+            return self.raster_cache.get(page, zoom).to_image()
+        except Exception as e:
+            logger.error(f"Error converting page {page_num} to image: {str(e)}")
+            raise
+
+    def get_page_raster(self, page_num: int, zoom: float = 2.0) -> PageRaster:
+        """
+        Renders a page once and returns its raster. Table detection, table crops,
+        math OCR and saving all read from the same pixmap buffer through a zero-copy
+        NumPy view, and the `raster_cache_size` most recently used rasters stay resident.
+
+        Args:
+            page_num (int): The index of the page to render.
+            zoom (float, optional): Scaling factor for the image resolution. Default is 2.0.
+
+        Returns:
+            PageRaster: The rendered page.
+        """
+
+        if not self.document:
+            self.load_pdf()
+
+        try:
+            return self.raster_cache.get(self.document[page_num], zoom)
         except Exception as e:
             logger.error(f"Error converting page {page_num} to image: {str(e)}")
             raise
 
-    def detect_tables(self, image: Image.Image) -> List[Dict]:
+    def crop_region(
+        self,
+        image: Union[Image.Image, PageRaster],
+        box: List[int],
+        page_num: int = None,
+    ) -> Image.Image:
+        """
+        Returns the `box` region of a page image for OCR. When the image is a raster
+        rendered below `crop_zoom`, only that region of the page is re-rendered at
+        `crop_zoom` instead of being cropped out of the low-resolution image.
+
+        Args:
+            image (Union[Image.Image, PageRaster]): The page image the box refers to.
+            box (List[int]): The region [x_min, y_min, x_max, y_max] in image pixels.
+            page_num (int, optional): The index of the page. Without it, the region
+                is cropped out of `image` as is.
+
+        Returns:
+            Image.Image: The region as a PIL image.
+        """
+        zoom = getattr(image, "zoom", None)
+        if zoom is None or zoom >= self.crop_zoom or page_num is None:
+            return image.crop(box)
+
+        if not self.document:
+            self.load_pdf()
+
+        clip = fitz.Rect(*box) / zoom
+        page = self.document[page_num]
+        return PageRaster.render(page, self.crop_zoom, clip=clip).to_image()
+
+    def output_box(
+        self, image: Union[Image.Image, PageRaster], box: List[int]
+    ) -> List[int]:
+        """
+        Converts a box in the pixels of `image` to the pixels of the page rendered
+        at `crop_zoom`, the space every reported table and equation box is in,
+        whatever zoom the page was detected at. Plain PIL images carry no zoom and
+        are taken to be rendered at `crop_zoom` already.
+        """
+        zoom = getattr(image, "zoom", None)
+        if zoom is None or zoom == self.crop_zoom:
+            return list(box)
+        scale = self.crop_zoom / zoom
+        return [int(round(v * scale)) for v in box]
+
+    def may_contain_table(self, page_num: int) -> bool:
+        """
+        Decides from the page's vector rules, word grid alignment and images
+        whether it could contain a table, see `pdfparse.layout.may_contain_table`.
+        Pages that fail the test are counted in `prefilter_stats["pages_skipped"]`.
+
+        Args:
+            page_num (int): The index of the page.
+
+        Returns:
+            bool: Whether the page should go through the table detector.
+        """
+        if not self.document:
+            self.load_pdf()
+
+        try:
+            page = self.document[page_num]
+            word_boxes, _ = blocks_to_array(page.get_text("words"))
+            image_boxes = [tuple(info["bbox"]) for info in page.get_image_info()]
+            candidate = may_contain_table(
+                page.get_drawings(), word_boxes, image_boxes, page.rect.get_area()
+            )
+        except Exception as e:
+            logger.error(f"Error in table prefilter on page {page_num}: {str(e)}")
+            candidate = True
+
+        self.prefilter_stats["pages_checked"] += 1
+        if not candidate:
+            self.prefilter_stats["pages_skipped"] += 1
+            logger.info(f"Skipping table detection on page {page_num}")
+        return candidate
+
+    def detect_tables(self, image: Union[Image.Image, PageRaster]) -> List[Dict]:
+        """
+        Detects tables in a single page image. See `detect_tables_batch`.
+        """
+        return self.detect_tables_batch([image])[0]
+
+    def detect_tables_batch(
+        self, images: List[Union[Image.Image, PageRaster]]
+    ) -> List[List[Dict]]:
+        """
+        Detects tables in several page images with a single forward pass of the
+        table transformer. The processor resizes and pads the pages to a common
+        shape, and the boxes are scaled back to each page's own size.
+
+        Args:
+            images (List[Union[Image.Image, PageRaster]]): The page images in which tables need to be detected.
+
+        Returns:
+            List[List[Dict]]: For every input image, a list of detected tables, where each dictionary contains:
+                - "confidence" (float): Confidence score of the detection.
+                - "box" (List[int]): Bounding box coordinates [x_min, y_min, x_max, y_max].
+        """
+        if not images:
+            return []
 
         try:
-            inputs = self.table_processor(images=image, return_tensors="pt")
+            inputs = self.table_processor(
+                images=[
+                    image.array if isinstance(image, PageRaster) else image
+                    for image in images
+                ],
+                return_tensors="pt",
+            )
             with torch.no_grad():
                 outputs = self.table_model(**inputs)
 
-            target_sizes = torch.tensor([image.size[::-1]])
-            results = self.table_processor.post_process_object_detection(
+            target_sizes = torch.tensor([image.size[::-1] for image in images])
+            batch_results = self.table_processor.post_process_object_detection(
                 outputs, threshold=0.9, target_sizes=target_sizes
-            )[0]
+            )
 
-            tables = []
-            for score, label, box in zip(
-                results["scores"], results["labels"], results["boxes"]
-            ):
-                if score > 0.9:
-                    box = [int(i) for i in box.tolist()]
-                    tables.append({"confidence": float(score), "box": box})
-            return tables
+            batch_tables = []
+            for results in batch_results:
+                tables = []
+                for score, label, box in zip(
+                    results["scores"], results["labels"], results["boxes"]
+                ):
+                    if score > 0.9:
+                        box = [int(i) for i in box.tolist()]
+                        tables.append({"confidence": float(score), "box": box})
+                batch_tables.append(tables)
+            return batch_tables
         except Exception as e:
             logger.error(f"Error detecting tables: {str(e)}")
-            return []
+            return [[] for _ in images]
 
     def extract_table_content(
-        self, image: Image.Image, box: List[int], table_index: int, page_num: int
+        self,
+        image: Union[Image.Image, PageRaster],
+        box: List[int],
+        table_index: int,
+        page_num: int,
     ) -> Tuple[str, str]:
         """
-        Detects tables in an image using a deep learning-based object detection model.
+        Crops a detected table out of a page image, saves the crop and runs OCR on it.
 
         Args:
-            image (Image.Image): The input image (a PIL Image) in which tables need to be detected.
+            image (Union[Image.Image, PageRaster]): The page image containing the table.
+            box (List[int]): Bounding box coordinates [x_min, y_min, x_max, y_max] of the table.
+            table_index (int): The index of the table on the page.
+            page_num (int): The index of the page.
 
         Returns:
-            List[Dict]: A list of detected tables, where each dictionary contains:
-                - "confidence" (float): Confidence score of the detection.
-                - "box" (List[int]): Bounding box coordinates [x_min, y_min, x_max, y_max].
+            Tuple[str, str]: The OCR text of the table and the path of the saved crop.
         """
 
         try:
-            table_img = image.crop(box)
+            table_img = self.crop_region(image, box, page_num)
+        except Exception as e:
+            logger.error(f"Error extracting table content: {str(e)}")
+            return "", ""
+        return self._save_and_ocr_table(table_img, table_index, page_num)
+
+    def _save_and_ocr_table(
+        self, table_img: Image.Image, table_index: int, page_num: int
+    ) -> Tuple[str, str]:
+        """
+        Saves an already cropped table and runs OCR on it. Only touches the PIL
+        image, never the document, so it is safe to call from worker threads.
+        """
+        try:
             table_path = os.path.join(
                 self.output_dir, f"table_page_{page_num}_{table_index}.png"
             )
             table_img.save(table_path)
 
-            table_text = pytesseract.image_to_string(table_img)
+            table_text = self.ocr_engine.image_to_string(table_img)
             return table_text, table_path
         except Exception as e:
             logger.error(f"Error extracting table content: {str(e)}")
             return "", ""
 
+    def extract_tables(
+        self,
+        image: Union[Image.Image, PageRaster],
+        tables: List[Dict],
+        page_num: int,
+    ) -> List[Dict]:
+        """
+        Builds the extraction record of every table detected on a page. Each table
+        is cropped, saved and OCR'd exactly once. The crops are rendered up front on
+        the calling thread, since PyMuPDF is not thread-safe, and only the tesseract
+        calls of all the tables on the page run concurrently in a thread pool.
+
+        Args:
+            image (Union[Image.Image, PageRaster]): The page image containing the tables.
+            tables (List[Dict]): The detections returned by `detect_tables`.
+            page_num (int): The index of the page.
+
+        Returns:
+            List[Dict]: One record per table with the keys "text", "box",
+                "confidence" and "image_path", in detection order. The box is in
+                `crop_zoom` pixels, see `output_box`.
+        """
+        if not tables:
+            return []
+
+        crops = []
+        for table in tables:
+            try:
+                crops.append(self.crop_region(image, table["box"], page_num))
+            except Exception as e:
+                logger.error(f"Error cropping table on page {page_num}: {str(e)}")
+                crops.append(None)
+
+        def extract(idx):
+            table = tables[idx]
+            if crops[idx] is None:
+                text, image_path = "", ""
+            else:
+                text, image_path = self._save_and_ocr_table(crops[idx], idx, page_num)
+            return {
+                "text": text,
+                "box": self.output_box(image, table["box"]),
+                "confidence": table["confidence"],
+                "image_path": image_path,
+            }
+
+        if len(tables) == 1 or self.ocr_workers <= 1:
+            return [extract(idx) for idx in range(len(tables))]
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.ocr_workers, len(tables))
+        ) as executor:
+            return list(executor.map(extract, range(len(tables))))
+
+    def detect_equation_regions(
+        self, page_num: int, scale: float = 1.0, padding: int = 4
+    ) -> List[List[int]]:
+        """
+        Finds the likely equation regions on a page from its span fonts and glyphs,
+        see `pdfparse.layout.find_equation_regions`.
+
+        Args:
+            page_num (int): The index of the page.
+            scale (float, optional): The zoom of the page image the boxes are meant for.
+            padding (int, optional): Pixels added around every region.
+
+        Returns:
+            List[List[int]]: The regions as [x_min, y_min, x_max, y_max] in image pixels.
+        """
+        if not self.document:
+            self.load_pdf()
+
+        page = self.document[page_num]
+        regions = find_equation_regions(page.get_text("dict"))
+        return [
+            [
+                max(0, int(x0 * scale) - padding),
+                max(0, int(y0 * scale) - padding),
+                int(x1 * scale) + padding,
+                int(y1 * scale) + padding,
+            ]
+            for x0, y0, x1, y1 in regions
+        ]
+
     def detect_and_convert_math(
-        self, image: Image.Image
+        self, image: Union[Image.Image, PageRaster], page_num: int = None
     ) -> List[Tuple[str, List[int]]]:
+        """
+        Converts the mathematical expressions of a page into LaTeX code.
+
+        Args:
+            image (Union[Image.Image, PageRaster]): The rendered page image.
+            page_num (int, optional): The index of the page. When given, only the
+                equation regions found by `detect_equation_regions` are cropped and
+                sent to LatexOCR, and pages without math never touch the model.
+                Otherwise the whole image is converted.
+
+        Returns:
+            List[Tuple[str, List[int]]]: The LaTeX code of each equation and its
+                bounding box [x_min, y_min, x_max, y_max] in `crop_zoom` pixels,
+                see `output_box`.
+        """
 
         try:
-            latex_code = self.latex_ocr(image)
-            equations = [(latex_code, [0, 0, image.width, image.height])]
+            if page_num is None:
+                boxes = [[0, 0, image.width, image.height]]
+            else:
+                scale = image.width / self.document[page_num].rect.width
+                boxes = self.detect_equation_regions(page_num, scale=scale)
+                if not boxes:
+                    return []
+                logger.info(
+                    f"Detected {len(boxes)} equation regions on page {page_num}"
+                )
+
+            # LatexOCR takes a single image per call, so the crops are
+            # converted back to back against the already loaded model
+            latex_ocr = self.latex_ocr
+            equations = []
+            for box in boxes:
+                box = [
+                    min(box[0], image.width),
+                    min(box[1], image.height),
+                    min(box[2], image.width),
+                    min(box[3], image.height),
+                ]
+                if box[2] <= box[0] or box[3] <= box[1]:
+                    continue
+                crop = self.crop_region(image, box, page_num)
+                equations.append((latex_ocr(crop), self.output_box(image, box)))
             return equations
         except Exception as e:
             logger.error(f"Error in math detection: {str(e)}")
@@ -270,51 +615,236 @@ class ResearchPaperParser:
             logger.error(f"Error extracting images from page {page_num}: {str(e)}")
             return []
 
-    def process_document(self) -> Dict:
+    def iter_page_range(self, page_nums: Sequence[int]) -> Iterator[Dict]:
+        """
+        Runs the full extraction pipeline over the given pages of the loaded document,
+        yielding each page's result as soon as it is done.
+
+        Args:
+            page_nums (Sequence[int]): The indices of the pages to process, in order.
+
+        Yields:
+            Dict: The result of one page, with the keys "page", "text", "tables",
+                "equations", "image" and "embedded_images".
+        """
 
         if not self.document:
             self.load_pdf()
 
-        results = {
-            "text": {},
-            "tables": {},
-            "equations": {},
-            "images": {},
-            "embedded_images": {},
-        }
+        # Saved pages are rendered once at crop_zoom, which the detector's
+        # processor downsamples and crops are cut from without re-rendering
+        page_zoom = self.crop_zoom if self.save else self.detection_zoom
+        page_nums = list(page_nums)
+        for batch_start in range(0, len(page_nums), self.table_batch_size):
+            batch_pages = page_nums[batch_start : batch_start + self.table_batch_size]
+            page_images = [self.get_page_raster(p, page_zoom) for p in batch_pages]
+            candidates = [
+                idx
+                for idx, page_num in enumerate(batch_pages)
+                if not self.table_prefilter or self.may_contain_table(page_num)
+            ]
+            batch_tables = [[] for _ in batch_pages]
+            candidate_tables = self.detect_tables_batch(
+                [page_images[idx] for idx in candidates]
+            )
+            for idx, tables in zip(candidates, candidate_tables):
+                batch_tables[idx] = tables
 
-        for page_num in range(len(self.document)):
-            logger.info(f"Processing page {page_num + 1}")
-
-            results["text"][page_num] = self.extract_text(page_num)
-            page_image = self.convert_page_to_image(page_num)
-
-            tables = self.detect_tables(page_image)
-            results["tables"][page_num] = [
-                {
-                    "text": self.extract_table_content(
-                        page_image, table["box"], idx, page_num
-                    )[0],
-                    "box": table["box"],
-                    "confidence": table["confidence"],
-                    "image_path": self.extract_table_content(
-                        page_image, table["box"], idx, page_num
-                    )[1],
+            for page_num, page_image, tables in zip(
+                batch_pages, page_images, batch_tables
+            ):
+                logger.info(f"Processing page {page_num + 1}")
+
+                page_result = {
+                    "page": page_num,
+                    "text": self.extract_text(page_num),
+                    "tables": self.extract_tables(page_image, tables, page_num),
+                    "equations": self.detect_and_convert_math(page_image, page_num),
+                    "image": None,
+                    "embedded_images": None,
                 }
-                for idx, table in enumerate(tables)
-            ]
 
-            results["equations"][page_num] = self.detect_and_convert_math(page_image)
+                if self.save:
+                    image_path = os.path.join(self.output_dir, f"page_{page_num}.png")
+                    page_image.save(image_path)
+                    page_result["image"] = image_path
+                    page_result["embedded_images"] = self.extract_images(page_num)
+
+                yield page_result
+
+    def iter_pages(self, workers: int = 1) -> Iterator[Dict]:
+        """
+        Processes every page of the document, yielding each page's result in page
+        order as soon as it is available, so that memory stays bounded by the pages
+        in flight and downstream stages can start on the first page early.
+        With a parse cache, an unchanged PDF is replayed from the cache instead.
+
+        Args:
+            workers (int, optional): Number of worker processes. With more than one
+                worker, contiguous page ranges are sharded across a process pool in which
+                every worker opens its own copy of the PDF and loads the models once
+                into its own registry. Default is 1 (serial).
+
+        Yields:
+            Dict: The result of one page, see `iter_page_range`.
+        """
+
+        if self.cache is None:
+            yield from self._iter_parsed_pages(workers)
+            return
+
+        cache_key = self.cache.key(
+            self.pdf_path,
+            "ResearchPaperParser",
+            PARSER_VERSION,
+            {
+                "save": self.save,
+                "output_dir": os.path.abspath(self.output_dir),
+                "table_backend": self.table_backend,
+                "detection_zoom": self.detection_zoom,
+                "crop_zoom": self.crop_zoom,
+                "table_prefilter": self.table_prefilter,
+            },
+        )
+        cached = self.cache.get(cache_key)
+        if cached is not None and all(
+            os.path.exists(path) for path in _page_files(cached)
+        ):
+            for page_result in cached:
+                page_result["equations"] = [
+                    (eq, box) for eq, box in page_result["equations"]
+                ]
+                yield page_result
+            return
+
+        # Only the page records are kept, not the rasters, so this stays small
+        pages = []
+        for page_result in self._iter_parsed_pages(workers):
+            pages.append(page_result)
+            yield page_result
+        self.cache.put(cache_key, pages)
+
+    def _iter_parsed_pages(self, workers: int) -> Iterator[Dict]:
+        if not self.document:
+            self.load_pdf()
+
+        total_pages = len(self.document)
+        workers = min(workers or 1, total_pages)
+        if workers <= 1:
+            yield from self.iter_page_range(range(total_pages))
+            return
+
+        # A few shards per worker keeps the pool busy when pages are uneven
+        shard_size = max(
+            self.table_batch_size, math.ceil(total_pages / (workers * 4))
+        )
+        shards = [
+            (start, min(start + shard_size, total_pages))
+            for start in range(0, total_pages, shard_size)
+        ]
+        logger.info(
+            f"Processing {total_pages} pages in {len(shards)} shards over {workers} workers"
+        )
+
+        cpu_count = os.cpu_count() or 1
+        initargs = (
+            self.pdf_path,
+            max(1, cpu_count // workers),
+            self._worker_options(workers),
+        )
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_page_worker,
+            initargs=initargs,
+        ) as executor:
+            # Only a bounded window of shards is in flight, so finished pages wait
+            # for the consumer instead of piling up in the parent
+            window = 2 * workers
+            pending = deque(
+                executor.submit(_process_page_range, shard) for shard in shards[:window]
+            )
+            next_shard = window
+            while pending:
+                shard_pages = pending.popleft().result()
+                # Refill the window before handing pages downstream
+                if next_shard < len(shards):
+                    pending.append(
+                        executor.submit(_process_page_range, shards[next_shard])
+                    )
+                    next_shard += 1
+                yield from shard_pages
+
+    def _worker_options(self, workers: int) -> Dict:
+        """
+        Returns the constructor arguments of the parser each pool worker builds.
+        """
+        options = {
+            "output_dir": self.output_dir,
+            "save": self.save,
+            "table_batch_size": self.table_batch_size,
+            "ocr_workers": max(1, self.ocr_workers // workers),
+            "raster_cache_size": self.raster_cache.max_entries,
+            "table_backend": self.table_backend,
+            "detection_zoom": self.detection_zoom,
+            "crop_zoom": self.crop_zoom,
+            "table_prefilter": self.table_prefilter,
+        }
+        # Modules cannot be pickled, so workers default to pytesseract themselves
+        if self.ocr_engine is not pytesseract:
+            options["ocr_engine"] = self.ocr_engine
+        # Workers load the default models themselves; a custom registry is sent
+        # as its loaders, which must therefore be picklable
+        if self.registry is not default_registry:
+            try:
+                pickle.dumps(self.registry)
+            except Exception as e:
+                raise ValueError(
+                    "Parsing with several workers needs a registry whose loaders can "
+                    f"be pickled, e.g. module-level functions: {str(e)}"
+                ) from e
+            options["registry"] = self.registry
+        return options
+
+    def process_pages(self, page_nums: Sequence[int]) -> Dict:
+        """
+        Runs the full extraction pipeline over the given pages of the loaded document.
+
+        Args:
+            page_nums (Sequence[int]): The indices of the pages to process, in order.
 
-            if self.save:
-                image_path = os.path.join(self.output_dir, f"page_{page_num}.png")
-                page_image.save(image_path)
-                results["images"][page_num] = image_path
-                results["embedded_images"][page_num] = self.extract_images(page_num)
+        Returns:
+            Dict: The results for those pages, in the same shape as `process_document`.
+        """
+        return _collect_pages(self.iter_page_range(page_nums))
 
-        return results
+    def process_document(self, workers: int = 1) -> Dict:
+        """
+        Processes every page of the document. See `iter_pages` for a streaming
+        alternative that does not hold every page in memory.
 
-    def save_results(self, results: Dict) -> None:
+        Args:
+            workers (int, optional): Number of worker processes, see `iter_pages`.
+
+        Returns:
+            Dict: The "text", "tables", "equations", "images" and "embedded_images"
+                of the document, each keyed by page index in page order.
+        """
+        return _collect_pages(self.iter_pages(workers))
+
+    def save_results(self, results: Union[Dict, Iterable[Dict]]) -> None:
+        """
+        Writes the text, tables, equations and a summary to the output directory.
+        The results are consumed one page at a time, so a page iterator such as
+        `iter_pages()` is saved incrementally.
+
+        Args:
+            results (Union[Dict, Iterable[Dict]]): The output of `process_document`,
+                or an iterable of per-page results.
+        """
+
+        if isinstance(results, dict):
+            results = _iter_collected_pages(results)
 
         try:
             text_file = os.path.join(self.output_dir, "text_content.txt")
@@ -322,43 +852,52 @@ class ResearchPaperParser:
             equations_file = os.path.join(self.output_dir, "equations.tex")
             summary_file = os.path.join(self.output_dir, "summary.txt")
 
-            with open(text_file, "w", encoding="utf-8") as f:
-                for page, text in results["text"].items():
-                    f.write(f"Page {page}:\n{text}\n{'='*50}\n")
+            pages_processed = 0
+            tables_found = 0
+            embedded_images = 0
+            detected_equations = []
+
+            with open(text_file, "w", encoding="utf-8") as text_f, open(
+                tables_file, "w", encoding="utf-8"
+            ) as tables_f, open(equations_file, "w", encoding="utf-8") as equations_f:
+                equations_f.write(
+                    "\\documentclass{article}\n\\usepackage{amsmath}\n\\begin{document}\n"
+                )
+
+                for page_result in results:
+                    page = page_result["page"]
+                    text_f.write(f"Page {page}:\n{page_result['text']}\n{'='*50}\n")
 
-            with open(tables_file, "w", encoding="utf-8") as f:
-                for page, tables in results["tables"].items():
-                    for idx, table in enumerate(tables):
-                        f.write(
+                    for idx, table in enumerate(page_result["tables"]):
+                        tables_f.write(
                             f"Page {page} - Table {idx} (Confidence: {table['confidence']}):\n"
                         )
-                        f.write(f"Box: {table['box']}\n")
-                        f.write(f"Text:\n{table['text']}\n{'-'*50}\n")
+                        tables_f.write(f"Box: {table['box']}\n")
+                        tables_f.write(f"Text:\n{table['text']}\n{'-'*50}\n")
+
+                    equations_f.write(f"\\section{{Page {page}}}\n")
+                    for eq, box in page_result["equations"]:
+                        equations_f.write(f"% Position: {box}\n")
+                        equations_f.write(
+                            f"\\begin{{equation}}\n{eq}\n\\end{{equation}}\n\n"
+                        )
 
-            with open(equations_file, "w", encoding="utf-8") as f:
-                f.write(
-                    "\\documentclass{article}\n\\usepackage{amsmath}\n\\begin{document}\n"
-                )
-                for page, eqs in results["equations"].items():
-                    f.write(f"\\section{{Page {page}}}\n")
-                    for eq, box in eqs:
-                        f.write(f"% Position: {box}\n")
-                        f.write(f"\\begin{{equation}}\n{eq}\n\\end{{equation}}\n\n")
-                f.write("\\end{document}")
+                    pages_processed += 1
+                    tables_found += len(page_result["tables"])
+                    embedded_images += len(page_result["embedded_images"] or [])
+                    detected_equations.append((page, page_result["equations"]))
+
+                equations_f.write("\\end{document}")
 
             with open(summary_file, "w", encoding="utf-8") as f:
-                f.write(f"Pages processed: {len(results['text'])}\n")
-                f.write(
-                    f"Tables found: {sum(len(t) for t in results['tables'].values())}\n"
-                )
+                f.write(f"Pages processed: {pages_processed}\n")
+                f.write(f"Tables found: {tables_found}\n")
                 f.write(
-                    f"Equations found: {sum(len(e) for e in results['equations'].values())}\n"
-                )
-                f.write(
-                    f"Embedded images extracted: {sum(len(i) for i in results['embedded_images'].values())}\n"
+                    f"Equations found: {sum(len(e) for _, e in detected_equations)}\n"
                 )
+                f.write(f"Embedded images extracted: {embedded_images}\n")
                 f.write("\nDetected Equations:\n")
-                for page, eqs in results["equations"].items():
+                for page, eqs in detected_equations:
                     f.write(f"Page {page}:\n")
                     for eq, box in eqs:
                         f.write(f"  - {eq} (Position: {box})\n")
@@ -367,15 +906,46 @@ class ResearchPaperParser:
         except Exception as e:
             logger.error(f"Error saving results: {str(e)}")
 
-    def zip_output_directory(self, zip_name: str = "output.zip") -> str:
+    def zip_output_directory(
+        self, zip_name: str = "output.zip", pages: Iterable[Dict] = None
+    ) -> str:
+        """
+        Zips the output directory.
+
+        Args:
+            zip_name (str, optional): The name of the archive.
+            pages (Iterable[Dict], optional): Per-page results, e.g. `iter_pages()`.
+                When given, they are saved with `save_results` and every page's
+                images are added to the archive as soon as that page is saved.
+
+        Returns:
+            str: The path of the archive.
+        """
         try:
             zip_path = os.path.join("/kaggle/working", zip_name)
             with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+                written = set()
+
+                def add(file_path):
+                    arcname = os.path.join(
+                        "output", os.path.relpath(file_path, self.output_dir)
+                    )
+                    if arcname not in written and os.path.isfile(file_path):
+                        zipf.write(file_path, arcname)
+                        written.add(arcname)
+
+                def zip_pages(pages):
+                    for page_result in pages:
+                        yield page_result
+                        for file_path in _page_files([page_result]):
+                            add(file_path)
+
+                if pages is not None:
+                    self.save_results(zip_pages(pages))
+
                 for root, _, files in os.walk(self.output_dir):
                     for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, self.output_dir)
-                        zipf.write(file_path, os.path.join("output", arcname))
+                        add(os.path.join(root, file))
             logger.info(f"Output directory zipped as {zip_path}")
             return zip_path
         except Exception as e:
@@ -383,6 +953,22 @@ class ResearchPaperParser:
             raise
 
 
+_worker_parser = None
+
+
+def _init_page_worker(pdf_path: str, torch_threads: int, options: Dict) -> None:
+    """Builds the per-process parser used by `iter_pages` workers."""
+    global _worker_parser
+    torch.set_num_threads(torch_threads)
+    _worker_parser = ResearchPaperParser(pdf_path, **options)
+    _worker_parser.load_pdf()
+
+
+def _process_page_range(page_range: Tuple[int, int]) -> List[Dict]:
+    start, stop = page_range
+    return list(_worker_parser.iter_page_range(range(start, stop)))
+
+
 if __name__ == "__main__":
     pdf_path = "/home/naba/Desktop/PRAGATI/satya.pdf"
     parser = ResearchPaperParser(pdf_path, output_dir="output", save=True)
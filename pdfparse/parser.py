@@ -1,4 +1,3 @@
-import io
 import fitz  # PyMuPDF
 import pytesseract
 from PIL import Image
@@ -6,6 +5,18 @@ import warnings
 import logging
 import os
 import time
+import math
+import multiprocessing
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from collections import deque
+from typing import NamedTuple
+import numpy as np
+from pdfparse.cache import ParseCache
+from pdfparse.layout import find_column_starts, find_ocr_regions, order_blocks
 
 warnings.filterwarnings("ignore")
 logging.basicConfig(
@@ -14,24 +25,255 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+PARSER_VERSION = "2"
+OCR_MIN_CHARS = 50
+# Smallest share of the page an image must cover to be OCR'd on its own
+OCR_MIN_REGION_FRACTION = 0.05
+# Largest page range a pool worker parses in one task
+PARALLEL_SHARD_PAGES = 16
+
+class PageText(NamedTuple):
+    """The extraction result of a single page."""
+    text: str
+    used_ocr: bool
+    ocr_failed: bool
+    ocr_seconds: float
+
+
+def _page_image(page, clip=None):
+    """
+    Render a page, or only the `clip` rectangle of it, for OCR, building the PIL
+    image straight from the raw pixmap samples instead of encoding and decoding a PNG.
+    """
+    pix = page.get_pixmap(clip=clip, alpha=False)
+    return Image.frombytes("RGB", (pix.width, pix.height), pix.samples_mv)
+
+
+def _ocr_page_image(image, page_num, ocr_engine):
+    """
+    Run OCR on a rendered page and time it.
+    
+    Returns:
+        PageText: The OCR text of the page, or an error marker if OCR failed
+    """
+    ocr_start_time = time.time()
+    try:
+        ocr_text = ocr_engine.image_to_string(image)
+        ocr_seconds = time.time() - ocr_start_time
+        logger.info(f"OCR completed for page {page_num+1}: extracted {len(ocr_text.strip())} characters in {ocr_seconds:.2f} seconds")
+        return PageText(ocr_text, True, False, ocr_seconds)
+    except Exception as e:
+        logger.error(f"OCR failed for page {page_num+1}: {str(e)}")
+        return PageText(f"[OCR ERROR ON PAGE {page_num+1}]", True, True, time.time() - ocr_start_time)
+
+
+def _ocr_regions(page):
+    """
+    Find the image regions of a page that need OCR, see `find_ocr_regions`.
+    Image boxes come from `get_image_info`, which does not decode the images.
+    
+    Returns:
+        tuple: The regions (as fitz.Rect) and the page's text blocks
+    """
+    image_boxes = [info["bbox"] for info in page.get_image_info()]
+    if not image_boxes:
+        return [], []
+    
+    # Block type 0 is text, type 1 an image
+    blocks = [block[:5] for block in page.get_text("blocks") if block[6] == 0]
+    text_boxes = np.array([block[:4] for block in blocks], dtype=np.float64).reshape(-1, 4)
+    text_lengths = np.array([len(block[4].strip()) for block in blocks], dtype=np.int64)
+    regions = find_ocr_regions(
+        image_boxes,
+        text_boxes,
+        text_lengths,
+        tuple(page.rect),
+        min_fraction=OCR_MIN_REGION_FRACTION,
+        max_text_chars=OCR_MIN_CHARS,
+    )
+    return [fitz.Rect(region) for region in regions], blocks
+
+
+def _ocr_page_regions(blocks, clips, page_num, ocr_engine):
+    """
+    Run OCR on the rendered image regions of a page and merge their text with the
+    page's text blocks in reading order (column by column, top to bottom).
+    
+    Args:
+        blocks (list): The page's text blocks, as (x0, y0, x1, y1, text)
+        clips (list): The (fitz.Rect, PIL.Image) of every region to OCR
+        page_num (int): The page index, for logging
+        ocr_engine: The OCR engine to use
+    
+    Returns:
+        PageText: The merged text of the page
+    """
+    ocr_start_time = time.time()
+    ocr_failed = False
+    region_blocks = []
+    for rect, image in clips:
+        try:
+            ocr_text = ocr_engine.image_to_string(image)
+        except Exception as e:
+            logger.error(f"OCR failed for a region of page {page_num+1}: {str(e)}")
+            ocr_text = f"[OCR ERROR ON PAGE {page_num+1}]"
+            ocr_failed = True
+        region_blocks.append((rect.x0, rect.y0, rect.x1, rect.y1, ocr_text))
+    ocr_seconds = time.time() - ocr_start_time
+    
+    merged = [block for block in list(blocks) + region_blocks if block[4].strip()]
+    if not merged:
+        return PageText("", True, ocr_failed, ocr_seconds)
+    boxes = np.array([block[:4] for block in merged], dtype=np.float64)
+    order, _ = order_blocks(boxes, find_column_starts(boxes))
+    text = "\n".join(merged[idx][4].strip() for idx in order) + "\n"
+    logger.info(f"OCR completed for {len(clips)} regions of page {page_num+1} in {ocr_seconds:.2f} seconds")
+    return PageText(text, True, ocr_failed, ocr_seconds)
+
+
+def _iter_pages(doc, page_nums, ocr_engine, ocr_workers, region_ocr=True):
+    """
+    Extract the text of the given pages, yielding each page as soon as it and every
+    page before it are done. Pages with fewer than OCR_MIN_CHARS characters are
+    OCR'd concurrently in a pool of `ocr_workers` threads (the OCR engine runs out
+    of process, so threads suffice), with at most twice that many rendered pages
+    waiting at any time to keep memory bounded.
+    
+    With `region_ocr`, pages holding large raster images without a text layer
+    (scanned figures and tables, or whole scanned pages) only have those image
+    regions rendered and OCR'd, and their text is merged with the text layer.
+    Pages without such images are OCR'd whole only if they have too little text.
+    
+    Args:
+        doc (fitz.Document): The opened document
+        page_nums (Sequence[int]): The pages to extract, in order
+        ocr_engine: The OCR engine to use
+        ocr_workers (int): Number of concurrent OCR calls
+        region_ocr (bool): Whether to OCR image regions instead of whole pages
+    
+    Yields:
+        tuple: (page_num, PageText), in the order of `page_nums`
+    """
+    # Pages in order; OCR'd pages hold their future until it is collected
+    pending = deque()
+    in_flight = 0
+    
+    with ThreadPoolExecutor(max_workers=ocr_workers) as executor:
+        for page_num in page_nums:
+            page = doc.load_page(page_num)
+            
+            # Try to extract text directly
+            text = page.get_text()
+            text_length = len(text.strip())
+            logger.debug(f"Page {page_num+1}: Extracted {text_length} characters")
+            
+            regions, blocks = _ocr_regions(page) if region_ocr else ([], [])
+            
+            if text_length >= OCR_MIN_CHARS and not regions:
+                logger.debug(f"Using direct text extraction for page {page_num+1}")
+                pending.append((page_num, PageText(text, False, False, 0.0)))
+            else:
+                while in_flight >= 2 * ocr_workers:
+                    done_num, result = pending.popleft()
+                    if isinstance(result, Future):
+                        in_flight -= 1
+                        result = result.result()
+                    yield done_num, result
+                
+                if regions:
+                    logger.info(f"Applying OCR to {len(regions)} image regions of page {page_num+1}")
+                    clips = [(rect, _page_image(page, clip=rect)) for rect in regions]
+                    future = executor.submit(_ocr_page_regions, blocks, clips, page_num, ocr_engine)
+                else:
+                    # Apply OCR if needed
+                    logger.info(f"Applying OCR to page {page_num+1} (only {text_length} characters found)")
+                    future = executor.submit(_ocr_page_image, _page_image(page), page_num, ocr_engine)
+                pending.append((page_num, future))
+                in_flight += 1
+            
+            # Release every leading page that is already done
+            while pending and not (isinstance(pending[0][1], Future) and not pending[0][1].done()):
+                done_num, result = pending.popleft()
+                if isinstance(result, Future):
+                    in_flight -= 1
+                    result = result.result()
+                yield done_num, result
+        
+        while pending:
+            done_num, result = pending.popleft()
+            if isinstance(result, Future):
+                result = result.result()
+            yield done_num, result
+
+
+def _parse_pages(doc, page_nums, ocr_engine, ocr_workers, region_ocr=True):
+    """
+    Extract the text of the given pages, see `_iter_pages`.
+    
+    Returns:
+        list: One PageText per page, in the order of `page_nums`
+    """
+    return [
+        page for _, page in _iter_pages(doc, page_nums, ocr_engine, ocr_workers, region_ocr)
+    ]
+
+
+def _parse_page_range(pdf_path, start, stop, ocr_engine=None, ocr_workers=1, region_ocr=True):
+    """
+    Parse pages [start, stop) of a PDF in a worker process, with its own document handle.
+    """
+    ocr_engine = ocr_engine or pytesseract
+    doc = fitz.open(pdf_path)
+    try:
+        return _parse_pages(doc, range(start, stop), ocr_engine, ocr_workers, region_ocr)
+    finally:
+        doc.close()
+
+
 class PDFParser:
     """
     A class to parse PDF files and extract text, with selective OCR application.
     OCR is only used when necessary and no images are saved to disk.
     """
     
-    def __init__(self, pdf_path, ocr_engine=pytesseract):
+    def __init__(
+        self,
+        pdf_path,
+        ocr_engine=pytesseract,
+        cache: ParseCache = None,
+        workers: int = None,
+        min_pages_per_worker: int = 16,
+        ocr_workers: int = None,
+        region_ocr: bool = True,
+    ):
         """
         Initialize the PDF parser.
         
         Args:
             pdf_path (str): Path to the PDF file
             ocr_engine: The OCR engine to use (default: pytesseract)
+            cache (ParseCache): Optional on-disk cache of parse results, keyed by the
+                                PDF's content so unchanged files are never re-parsed
+            workers (int): Maximum number of processes to parse with (default: CPU count)
+            min_pages_per_worker (int): Pages each process must get for the pool to be
+                                        used; smaller PDFs are parsed in-process
+            ocr_workers (int): Maximum number of pages OCR'd concurrently
+                               (default: CPU count, at most 8)
+            region_ocr (bool): OCR only the scanned image regions of a page and merge
+                               them with its text layer, instead of OCR'ing whole
+                               pages that have too little text
         """
         self.pdf_path = pdf_path
         self.ocr_engine = ocr_engine
+        self.cache = cache
+        self.workers = workers
+        self.min_pages_per_worker = max(1, min_pages_per_worker)
+        self.ocr_workers = ocr_workers or min(8, os.cpu_count() or 1)
+        self.region_ocr = region_ocr
+        self.ocr_latencies = {}
         self.extracted_text = ""
         self.has_parsed = False
+        self._cache_hit = None
         logger.info(f"Initialized PDFParser for file: {pdf_path}")
         
         # Validate PDF file existence
@@ -51,53 +293,29 @@ class PDFParser:
         start_time = time.time()
         
         try:
-            doc = fitz.open(self.pdf_path)
-            total_pages = len(doc)
-            logger.info(f"Successfully opened PDF with {total_pages} pages")
+            pages = []
+            ocr_pages = []
+            ocr_failed = False
+            self.ocr_latencies = {}
+            for page_num, page in self._iter_page_texts():
+                pages.append(page.text)
+                if page.used_ocr:
+                    ocr_pages.append(page_num)
+                    self.ocr_latencies[page_num] = page.ocr_seconds
+                ocr_failed = ocr_failed or page.ocr_failed
             
-            full_text = []
-            ocr_applied_count = 0
+            if self.ocr_latencies:
+                latencies = list(self.ocr_latencies.values())
+                logger.info(f"OCR latency per page: mean {sum(latencies) / len(latencies):.2f} seconds, max {max(latencies):.2f} seconds")
+            logger.info(f"PDF processing completed. Applied OCR to {len(ocr_pages)} of {len(pages)} pages")
             
-            for page_num in range(total_pages):
-                logger.debug(f"Processing page {page_num+1}/{total_pages}")
-                page = doc.load_page(page_num)
-                
-                # Try to extract text directly
-                text = page.get_text()
-                text_length = len(text.strip())
-                logger.debug(f"Page {page_num+1}: Extracted {text_length} characters")
-                
-                # Apply OCR if needed
-                if text_length < 50:
-                    logger.info(f"Applying OCR to page {page_num+1} (only {text_length} characters found)")
-                    ocr_start_time = time.time()
-                    
-                    try:
-                        pix = page.get_pixmap()
-                        img_bytes = pix.tobytes("png")
-                        img = Image.open(io.BytesIO(img_bytes))
-                        ocr_text = self.ocr_engine.image_to_string(img)
-                        ocr_length = len(ocr_text.strip())
-                        
-                        logger.info(f"OCR completed for page {page_num+1}: extracted {ocr_length} characters in {time.time() - ocr_start_time:.2f} seconds")
-                        full_text.append(ocr_text)
-                        ocr_applied_count += 1
-                    except Exception as e:
-                        logger.error(f"OCR failed for page {page_num+1}: {str(e)}")
-                        full_text.append(f"[OCR ERROR ON PAGE {page_num+1}]")
-                else:
-                    logger.debug(f"Using direct text extraction for page {page_num+1}")
-                    full_text.append(text)
-            
-            # Store total pages and OCR count before closing the document
-            logger.info(f"PDF processing completed. Applied OCR to {ocr_applied_count} of {total_pages} pages")
-            
-            # Now close the document
-            doc.close()
-            
-            self.extracted_text = "\n\n".join(full_text)
+            self.extracted_text = "\n\n".join(pages)
             self.has_parsed = True
             
+            # Pages with OCR errors are not cached so that they are retried next time
+            if self._cache_hit is None and self.cache is not None and not ocr_failed:
+                self.cache.put(self._cache_key(), {"pages": pages, "ocr_pages": ocr_pages})
+            
             total_time = time.time() - start_time
             logger.info(f"PDF parsing completed in {total_time:.2f} seconds, extracted {len(self.extracted_text)} characters")
             
@@ -107,9 +325,127 @@ class PDFParser:
             logger.error(f"Error parsing PDF: {str(e)}", exc_info=True)
             raise
     
+    def iter_pages(self):
+        """
+        Stream the text of the PDF page by page, applying OCR only when necessary.
+        The document is only opened once iteration starts, and pages are yielded
+        in order as soon as they are extracted, so memory stays bounded by the
+        pages being OCR'd rather than by the size of the document. Nothing is
+        kept on the parser; use `parse` to get the whole text at once.
+        
+        Yields:
+            tuple: (page_number, text, used_ocr), with 0-based page numbers
+        """
+        for page_num, page in self._iter_page_texts():
+            yield page_num, page.text, page.used_ocr
+    
+    def _cache_key(self):
+        return self.cache.key(self.pdf_path, "PDFParser", PARSER_VERSION, self.cache_options())
+    
+    def _iter_page_texts(self):
+        """
+        Yields (page_num, PageText) for every page, from the cache when possible
+        and otherwise from the document, in-process or over a process pool.
+        Sets `self._cache_hit` to the cached entry, or None on a miss.
+        """
+        self._cache_hit = None
+        if self.cache is not None:
+            self._cache_hit = self.cache.get(self._cache_key())
+            if self._cache_hit is not None:
+                ocr_pages = set(self._cache_hit["ocr_pages"])
+                logger.info(f"Loaded {len(self._cache_hit['pages'])} cached pages")
+                for page_num, text in enumerate(self._cache_hit["pages"]):
+                    yield page_num, PageText(text, page_num in ocr_pages, False, 0.0)
+                return
+        
+        doc = fitz.open(self.pdf_path)
+        try:
+            total_pages = len(doc)
+            logger.info(f"Successfully opened PDF with {total_pages} pages")
+            
+            workers = self._resolve_workers(total_pages)
+            if workers > 1:
+                doc.close()
+                yield from self._iter_parallel(total_pages, workers)
+            else:
+                yield from _iter_pages(
+                    doc, range(total_pages), self.ocr_engine, self.ocr_workers, self.region_ocr
+                )
+        finally:
+            if not doc.is_closed:
+                doc.close()
+    
+    def _resolve_workers(self, total_pages):
+        """
+        Decides how many processes to parse with. Small PDFs stay single-process,
+        since starting a pool costs more than it saves below
+        `min_pages_per_worker` pages per worker.
+        """
+        requested = self.workers or os.cpu_count() or 1
+        return max(1, min(requested, total_pages // self.min_pages_per_worker))
+    
+    def _iter_parallel(self, total_pages, workers):
+        """
+        Splits the page range into contiguous shards and parses them in a process
+        pool, where every worker opens its own fitz.Document. Shards are yielded
+        page by page in order, each as soon as it and the shards before it are done.
+        At most `2 * workers` shards of at most PARALLEL_SHARD_PAGES pages are in
+        flight or waiting to be consumed, so memory stays bounded however long the
+        document is.
+        """
+        shard_size = max(1, min(math.ceil(total_pages / (workers * 2)), PARALLEL_SHARD_PAGES))
+        shards = [
+            (start, min(start + shard_size, total_pages))
+            for start in range(0, total_pages, shard_size)
+        ]
+        logger.info(f"Parsing {total_pages} pages in {len(shards)} shards over {workers} processes")
+        
+        # Modules cannot be pickled, so workers fall back to pytesseract themselves
+        ocr_engine = None if self.ocr_engine is pytesseract else self.ocr_engine
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            def submit(start, stop):
+                return executor.submit(
+                    _parse_page_range,
+                    self.pdf_path,
+                    start,
+                    stop,
+                    ocr_engine,
+                    max(1, self.ocr_workers // workers),
+                    self.region_ocr,
+                )
+            
+            window = 2 * workers
+            pending = deque((start, submit(start, stop)) for start, stop in shards[:window])
+            next_shard = window
+            while pending:
+                start, future = pending.popleft()
+                shard_pages = future.result()
+                # Refill the window before handing pages downstream
+                if next_shard < len(shards):
+                    pending.append((shards[next_shard][0], submit(*shards[next_shard])))
+                    next_shard += 1
+                yield from enumerate(shard_pages, start)
+    
+    def cache_options(self):
+        """
+        Returns the parsing options that change the extracted text. Anything
+        derived from the text, such as a vector index, should be keyed by them.
+        """
+        engine = getattr(self.ocr_engine, "__name__", type(self.ocr_engine).__name__)
+        return {
+            "ocr_engine": engine,
+            "ocr_min_chars": OCR_MIN_CHARS,
+            "region_ocr": self.region_ocr,
+            "ocr_min_region_fraction": OCR_MIN_REGION_FRACTION,
+        }
+    
     def save_text_to_file(self, output_path=None):
         """
-        Save the extracted text to a file.
+        Save the extracted text to a file. If the PDF has not been parsed yet, pages
+        are streamed from `iter_pages` and written as they are extracted, without
+        holding the whole text in memory.
         
         Args:
             output_path (str): Path where to save the text file.
@@ -118,19 +454,23 @@ class PDFParser:
         Returns:
             str: Path to the saved text file
         """
-        if not self.has_parsed:
-            logger.info("No parsed text found, parsing PDF before saving")
-            self.parse()
-        
         if output_path is None:
             output_path = self.pdf_path.rsplit('.', 1)[0] + '.txt'
             logger.info(f"No output path specified, using default: {output_path}")
         
         try:
+            written = 0
             with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(self.extracted_text)
+                if self.has_parsed:
+                    written = f.write(self.extracted_text)
+                else:
+                    logger.info("No parsed text found, streaming pages to file")
+                    for page_num, text, _ in self.iter_pages():
+                        if page_num > 0:
+                            written += f.write("\n\n")
+                        written += f.write(text)
             
-            logger.info(f"Text successfully saved to {output_path} ({len(self.extracted_text)} characters)")
+            logger.info(f"Text successfully saved to {output_path} ({written} characters)")
             return output_path
         
         except Exception as e:
@@ -2,21 +2,22 @@ import warnings
 import logging
 import uuid
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage
 from pdfparse.parse import ResearchPaperParser
 from utils.chat import invoke_llm_langchain
 import yaml
-from llama_index.core import VectorStoreIndex
 from llama_index.core import Settings
-from llama_index.vector_stores.chroma import ChromaVectorStore
-from llama_index.core.storage.storage_context import StorageContext
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from llama_index.core.schema import Document
-from pdfparse.parser import PDFParser
+from llama_index.core.schema import Document, QueryBundle
+from pdfparse.parser import PARSER_VERSION, PDFParser
+from pdfparse.cache import ParseCache, file_digest
+from pdfparse.indexes import IndexManager, default_manager, index_key
+from pdfparse.lexical import HybridRetriever
+from pdfparse.numpy_index import default_numpy_manager
+from pdfparse.models import EMBED_MODEL_NAME, registry
 from llama_index.core.node_parser import SentenceSplitter
-import chromadb
 
 warnings.filterwarnings("ignore")
 
@@ -30,22 +31,46 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 load_dotenv()
 
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+# Concurrent LLM calls of `rag_query_batch`; kept low to stay within the
+# requests-per-minute limit of the Groq tier
+LLM_MAX_CONCURRENCY = int(os.getenv("PRAGATI_LLM_CONCURRENCY", "2"))
+
+# The index manager of every vector index backend, see `RAG.__init__`
+INDEX_BACKENDS = {
+    "chroma": default_manager,
+    "numpy": default_numpy_manager,
+}
+
 
 class RAG:
-    def __init__(self, pdf_path):
+    def __init__(self, pdf_path, index_manager: IndexManager = None, backend="chroma"):
+        """
+        Args:
+            pdf_path (str): Path to the PDF file
+            index_manager (IndexManager): Where indexes are stored and shared;
+                                          defaults to the manager of `backend`
+            backend (str): "chroma" for a persisted Chroma collection, or "numpy"
+                           for an exact in-memory index, which is faster for a
+                           single paper of a few hundred chunks
+        """
+        if backend not in INDEX_BACKENDS:
+            raise ValueError(
+                f"Unknown index backend '{backend}', expected one of {list(INDEX_BACKENDS)}"
+            )
         logger.info(f"Initializing RAG with PDF: {pdf_path}")
-        self.parser = PDFParser(pdf_path)
-        self.text = self.parser.parse()
-        logger.info(f"Successfully loaded document text")
-        self.embed_model = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
-        logger.info(
-            "Initialized embedding model: sentence-transformers/all-MiniLM-L6-v2"
-        )
+        self.pdf_path = pdf_path
+        self.parser = PDFParser(pdf_path, cache=ParseCache())
+        self._text = None
+        # The embedding model and the indexes are shared by every RAG of the process
+        self.embed_model = registry.get("embed_model")
+        self.backend = backend
+        self.index_manager = index_manager or INDEX_BACKENDS[backend]
+        logger.info(f"Using embedding model: {EMBED_MODEL_NAME}")
         Settings.embed_model = self.embed_model
-        Settings.chunk_size = 1000
-        Settings.chunk_overlap = 100
+        Settings.chunk_size = CHUNK_SIZE
+        Settings.chunk_overlap = CHUNK_OVERLAP
         current_dir = os.path.dirname(os.path.abspath(__file__))
         project_root = os.path.dirname(current_dir)
         prompts_path = os.path.join(project_root, "utils", "prompts.yaml")
@@ -53,6 +78,30 @@ class RAG:
             self.prompts = yaml.safe_load(file)["RAG_prompts"]
         logger.info(f"Loaded prompts from {prompts_path}")
 
+    @property
+    def text(self):
+        """
+        The text of the PDF, parsed on first access only, since a stored index
+        makes it unnecessary.
+        """
+        if self._text is None:
+            self._text = self.parser.parse()
+            logger.info(f"Successfully loaded document text")
+        return self._text
+
+    def index_key(self):
+        """
+        Returns the key of this document's index: its content hash, the parser
+        options, the chunking parameters and the embedding model.
+        """
+        return index_key(
+            file_digest(self.pdf_path),
+            CHUNK_SIZE,
+            CHUNK_OVERLAP,
+            EMBED_MODEL_NAME,
+            {"parser": PARSER_VERSION, **self.parser.cache_options()},
+        )
+
     def prepare_documents_from_text(self, text):
         logger.info("Preparing documents from text")
         documents = []
@@ -74,7 +123,7 @@ class RAG:
     def process_documents(self, docs):
         logger.info(f"Processing {len(docs)} documents into LlamaIndex format")
 
-        splitter = SentenceSplitter(chunk_size=1000, chunk_overlap=100)
+        splitter = SentenceSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
         llama_nodes = []
         for doc in docs:
             llama_doc = Document(text=doc["content"], metadata=doc["metadata"])
@@ -93,30 +142,53 @@ class RAG:
         return llama_nodes
 
 
-    def create_db(self):
-        logger.info("Creating vector database from documents")
-
+    def build_nodes(self):
         documents = self.prepare_documents_from_text(self.text)
-        llama_nodes = self.process_documents(documents)
-        collection_name = f"Randomness_{uuid.uuid4().hex[:8]}"
-        chroma_client = chromadb.PersistentClient(path="./chroma_db")
-        chroma_collection = chroma_client.get_or_create_collection(collection_name)
+        return self.process_documents(documents)
 
-        logger.info(f"Created Chroma collection: {collection_name}")
-
-        vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-        storage_context = StorageContext.from_defaults(vector_store=vector_store)
-        index = VectorStoreIndex(nodes=llama_nodes, storage_context=storage_context)
-
-        logger.info(f"Successfully created vector index with {len(llama_nodes)} nodes")
+    def create_db(self):
+        """
+        Returns the vector index of the document. It is embedded only the first
+        time; afterwards the stored index is reopened, see `IndexManager`.
+        """
+        logger.info("Creating vector database from documents")
+        index = self.index_manager.get_or_build(
+            self.index_key(), self.build_nodes, self.embed_model
+        )
+        cache = getattr(self.embed_model, "cache", None)
+        if cache is not None:
+            stats = cache.stats()
+            logger.info(
+                f"Vector index ready; embedding cache: {stats['hits']} hits, "
+                f"{stats['misses']} misses ({stats['hit_rate']:.1%} hit rate)"
+            )
+        else:
+            logger.info("Vector index ready")
         return index
 
-    def create_retriever(self, index, similarity_top_k=5):
-
-        logger.info(f"Creating retriever with similarity_top_k={similarity_top_k}")
+    def create_retriever(self, index, similarity_top_k=5, hybrid=False, alpha=0.5):
+        """
+        Args:
+            index: The index returned by `create_db`
+            similarity_top_k (int): Number of chunks retrieved per query
+            hybrid (bool): Fuse dense retrieval with BM25 over the same chunks, which
+                           finds exact terms (datasets, metrics, numbers) the
+                           embedding misses, so a smaller top-k suffices
+            alpha (float): Weight of the dense score in the hybrid score
+        """
+        logger.info(f"Creating retriever with similarity_top_k={similarity_top_k}, hybrid={hybrid}")
 
-        retriever = index.as_retriever(similarity_top_k=similarity_top_k)
-        return retriever
+        if not hybrid:
+            return self.index_manager.retriever(index, similarity_top_k)
+        lexical = self.index_manager.get_lexical(self.index_key(), self.build_nodes)
+        candidate_k = 4 * similarity_top_k
+        return HybridRetriever(
+            self.index_manager.retriever(index, candidate_k),
+            lexical,
+            similarity_top_k=similarity_top_k,
+            alpha=alpha,
+            candidate_k=candidate_k,
+        )
 
     def rag_query(self, query_text, retriever):
         query_id = str(uuid.uuid4())
@@ -124,7 +196,83 @@ class RAG:
 
         retrieval_result = retriever.retrieve(query_text)
         logger.info(f"Retrieved {len(retrieval_result)} relevant nodes")
+        return self._answer(query_id, query_text, retrieval_result)
+
+    def rag_query_batch(
+        self, queries, retriever, max_concurrency=LLM_MAX_CONCURRENCY, retrieval_queries=None
+    ):
+        """
+        Answers several queries against the same retriever. The queries are embedded
+        in one forward pass and retrieved together: with one matrix product on the
+        NumPy backend, one collection query on Chroma, and one pass over the BM25
+        postings for hybrid retrieval. The LLM calls then run concurrently, at most
+        `max_concurrency` at a time. A query whose LLM call fails does not fail the
+        batch: its result has an empty answer, no tokens and the error under "error".
+
+        Args:
+            queries (List[str]): The query texts
+            retriever: A retriever returned by `create_retriever`
+            max_concurrency (int): Maximum number of concurrent LLM calls
+            retrieval_queries (List[str]): The texts to retrieve with, if they differ
+                                           from the queries, e.g. without the
+                                           instructions wrapped around them
+
+        Returns:
+            List[Dict]: One `rag_query` result per query, in input order, each with
+                        its own token counts and an "error", None on success
+        """
+        if not queries:
+            return []
+        logger.info(f"Processing a batch of {len(queries)} queries")
+
+        retrieval_queries = list(retrieval_queries or queries)
+        # Queries bypass the chunk embedding cache when there is one
+        embed_queries = getattr(
+            self.embed_model, "embed_queries", self.embed_model.embed_documents
+        )
+        query_vectors = embed_queries(retrieval_queries)
+        if hasattr(retriever, "retrieve_batch"):
+            retrieval_results = retriever.retrieve_batch(query_vectors, retrieval_queries)
+        else:
+            retrieval_results = [
+                retriever.retrieve(QueryBundle(query_str=query_text, embedding=list(vector)))
+                for query_text, vector in zip(retrieval_queries, query_vectors)
+            ]
+        logger.info(f"Retrieved nodes for {len(retrieval_results)} queries")
+
+        def answer(query_text, nodes):
+            query_id = str(uuid.uuid4())
+            try:
+                response = self._answer(query_id, query_text, nodes)
+                response["error"] = None
+                return response
+            except Exception as e:
+                logger.error(f"Query {query_id} failed: {str(e)}")
+                return {
+                    "query_id": query_id,
+                    "query": query_text,
+                    "result": "",
+                    "source_documents": [],
+                    "input_tokens": 0,
+                    "output_tokens": 0,
+                    "error": str(e),
+                }
+
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            responses = list(executor.map(answer, queries, retrieval_results))
+
+        failed = sum(response["error"] is not None for response in responses)
+        logger.info(
+            f"Answered {len(responses) - failed} of {len(responses)} queries: "
+            f"{sum(r['input_tokens'] for r in responses)} input tokens, "
+            f"{sum(r['output_tokens'] for r in responses)} output tokens"
+        )
+        return responses
 
+    def _answer(self, query_id, query_text, retrieval_result):
+        """
+        Prompts the LLM with the query and the retrieved nodes as context.
+        """
         context_parts = []
         source_documents = []
 
@@ -0,0 +1,121 @@
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+
+
+class _PixmapBuffer:
+    """
+    Exposes a pixmap's sample buffer to NumPy through the array interface. Every
+    array created from it, and every view of those, holds this object as its
+    base, and through it the pixmap, so the buffer cannot be freed while any of
+    them is in use.
+    """
+
+    def __init__(self, pixmap: fitz.Pixmap):
+        self.pixmap = pixmap
+        self.__array_interface__ = {
+            "shape": (pixmap.height, pixmap.width, pixmap.n),
+            "typestr": "|u1",
+            "data": (pixmap.samples_ptr, True),
+            "version": 3,
+        }
+
+
+class PageRaster:
+    """
+    A page rendered once into a PyMuPDF pixmap. `array` is a read-only NumPy view
+    over the pixmap's own sample buffer, so no copy of the page is ever made;
+    only crops are materialised as PIL images. The array and its views keep the
+    pixmap alive, so they stay valid after the raster is evicted from its cache.
+    """
+
+    def __init__(self, pixmap: fitz.Pixmap, page_num: int, zoom: float):
+        self.pixmap = pixmap
+        self.page_num = page_num
+        self.zoom = zoom
+        self.array = np.asarray(_PixmapBuffer(pixmap))
+
+    @classmethod
+    def render(
+        cls, page: fitz.Page, zoom: float = 2.0, clip: fitz.Rect = None
+    ) -> "PageRaster":
+        """
+        Renders a page, or only the `clip` rectangle of it (in page points), at `zoom`.
+        """
+        pixmap = page.get_pixmap(
+            matrix=fitz.Matrix(zoom, zoom), clip=clip, alpha=False
+        )
+        return cls(pixmap, page.number, zoom)
+
+    @property
+    def width(self) -> int:
+        return self.pixmap.width
+
+    @property
+    def height(self) -> int:
+        return self.pixmap.height
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    @property
+    def nbytes(self) -> int:
+        return self.array.nbytes
+
+    def crop(self, box: List[int]) -> Image.Image:
+        """
+        Returns the [x_min, y_min, x_max, y_max] region of the page as a PIL image.
+        """
+        x0, y0, x1, y1 = (int(v) for v in box)
+        region = self.array[max(0, y0) : y1, max(0, x0) : x1]
+        return Image.fromarray(np.ascontiguousarray(region))
+
+    def to_image(self) -> Image.Image:
+        return Image.fromarray(self.array)
+
+    def save(self, path: str) -> None:
+        self.pixmap.save(path)
+
+
+class RasterCache:
+    """
+    A thread-safe LRU cache of page rasters, keyed by page index and zoom.
+    At most `max_entries` rasters stay resident.
+    """
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max(1, max_entries)
+        self._rasters: "OrderedDict[Tuple[int, float], PageRaster]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, page: fitz.Page, zoom: float = 2.0) -> PageRaster:
+        key = (page.number, zoom)
+        with self._lock:
+            raster = self._rasters.get(key)
+            if raster is not None:
+                self._rasters.move_to_end(key)
+                return raster
+
+        raster = PageRaster.render(page, zoom)
+        with self._lock:
+            self._rasters[key] = raster
+            self._rasters.move_to_end(key)
+            while len(self._rasters) > self.max_entries:
+                self._rasters.popitem(last=False)
+        return raster
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rasters.clear()
+
+    def __len__(self) -> int:
+        return len(self._rasters)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(raster.nbytes for raster in list(self._rasters.values()))